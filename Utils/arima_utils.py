@@ -1,7 +1,10 @@
 from statsmodels.tsa.stattools import adfuller
 import statsmodels.api as sm
 import numpy as np
+from Utils.model_store_utils import fitted_results
 from Utils.metrics_utils import calculate_metrics, calculate_metrics_precipitation
+from Utils.parallel_utils import run_fits
+from Utils.resample_utils import RESOLUTIONS, aggregate_series, disaggregate_forecast, forecast_periods
 
 
 # Function to perform stationarity check
@@ -10,48 +13,76 @@ def check_stationarity(series):
     return {"ADF Statistic": result[0], "p-value": result[1]}
 
 
-# Function to train ARIMA model and forecast values
-def arima_forecast(data, p, d, q, future_days):
+# Function to fit ARIMA on one feature and forecast it
+def fit_arima_feature(feature, column_name, p, d, q, future_days, city_name=None, resolution="D"):
+    """
+    Returns (forecast, summary, metrics); forecast and metrics are None if the fit failed.
+    With city_name the fit is stored and later days are filtered with its parameters instead of refitting.
+    resolution "W" or "M" fits weekly/monthly aggregates and spreads the forecast back over days.
+    """
+    try:
+        series = column_name.dropna()
+        fit_series, steps = series, future_days
+        if resolution != "D":
+            fit_series = aggregate_series(series, feature, resolution)
+            steps = forecast_periods(series, fit_series, resolution, future_days)
+
+        # Train ARIMA model
+        if city_name:
+            store_name = feature if resolution == "D" else f"{feature} ({RESOLUTIONS[resolution]})"
+            model_fit, fit_status = fitted_results(fit_series, city_name, store_name, "arima", (p, d, q))
+        else:
+            model = sm.tsa.ARIMA(fit_series, order=(p, d, q))
+            model_fit, fit_status = model.fit(), "fitted"
+        forecast = model_fit.forecast(steps=steps)
+        if resolution != "D":
+            forecast = disaggregate_forecast(forecast, series, fit_series, feature, resolution, future_days)
+
+        # Calculate Errors for forecast
+        actual_values = column_name.dropna()[-future_days:]  # Last 'future_days' as actual
+
+        print(f"Actual Values Length: {len(actual_values)}")
+        print(f"Forecast Length: {len(forecast)}")
+
+        # Calculate error metrics if actual values exist
+        if feature == "Total Precipitation":
+            metrics = calculate_metrics_precipitation(actual_values, forecast)
+        else:
+            metrics = calculate_metrics(actual_values, forecast)
+
+        summary = {
+            "Feature": feature,
+            "AR Coefficient": model_fit.params.get("ar.L1", np.nan),
+            "MA Coefficient": model_fit.params.get("ma.L1", np.nan),
+            "Sigma2": model_fit.params.get("sigma2", np.nan),
+            "AIC": model_fit.aic,
+            "BIC": model_fit.bic,
+            "MSE": metrics["MSE"],
+            "MAE": metrics["MAE"],
+            "R²": metrics["R²"],
+            "MAPE (%)": metrics["MAPE"],
+            "SMAPE (%)": metrics["SMAPE"],
+            "Accuracy (%)": metrics["Accuracy"],
+            "Fit": fit_status
+        }
+        return forecast, summary, metrics
+
+    except Exception as e:
+        return None, {"Feature": feature, "Error": str(e)}, None
+
+
+# Function to merge per-feature fit results into forecasts, summaries and overall metrics
+def merge_feature_results(features, results):
     forecasts = {}
     summaries = []
     overall_metrics = {}
 
-    for feature, column_name in data.items():
-        try:
-            # Train ARIMA model
-            model = sm.tsa.ARIMA(column_name.dropna(), order=(p, d, q))
-            model_fit = model.fit()
-            forecast = model_fit.forecast(steps=future_days)
-            forecasts[feature] = forecast
-
-            # Calculate Errors for forecast
-            actual_values = column_name.dropna()[-future_days:]  # Last 'future_days' as actual
-
-            print(f"Actual Values Length: {len(actual_values)}")
-            print(f"Forecast Length: {len(forecast)}")
-
-            # Calculate error metrics if actual values exist
-            if feature == "Total Precipitation":
-                metrics = calculate_metrics_precipitation(actual_values, forecast)
-            else:
-                metrics = calculate_metrics(actual_values, forecast)
-
-            summaries.append({
-                "Feature": feature,
-                "AR Coefficient": model_fit.params.get("ar.L1", np.nan),
-                "MA Coefficient": model_fit.params.get("ma.L1", np.nan),
-                "Sigma2": model_fit.params.get("sigma2", np.nan),
-                "AIC": model_fit.aic,
-                "BIC": model_fit.bic,
-                "MSE": metrics["MSE"],
-                "MAE": metrics["MAE"],
-                "R²": metrics["R²"],
-                "MAPE (%)": metrics["MAPE"],
-                "SMAPE (%)": metrics["SMAPE"],
-                "Accuracy (%)": metrics["Accuracy"]
-            })
+    for feature, (forecast, summary, metrics) in zip(features, results):
+        forecasts[feature] = forecast
+        summaries.append(summary)
 
-            # Aggregate metrics across features
+        # Aggregate metrics across features
+        if metrics is not None:
             overall_metrics[feature] = {
                 "MSE": metrics["MSE"],
                 "MAE": metrics["MAE"],
@@ -60,8 +91,30 @@ def arima_forecast(data, p, d, q, future_days):
                 "SMAPE": metrics["SMAPE"],
                 "Accuracy": metrics["Accuracy"]
             }
-
-        except Exception as e:
-            forecasts[feature] = None
-            summaries.append({"Feature": feature, "Error": str(e)})
     return forecasts, summaries, overall_metrics
+
+
+# Function to train ARIMA model and forecast values
+def arima_forecast(data, p, d, q, future_days, workers=None, orders=None, city_name=None, resolution="D"):
+    """
+    Features are fitted in parallel on the shared process pool; workers=1 fits them one after another.
+    orders maps features to their own (p, d, q), e.g. from auto_orders; other features use p, d, q.
+    city_name keeps the fitted parameters so new days only need a filter pass (see fitted_results).
+    resolution "W"/"M" fits weekly/monthly aggregates, disaggregated to daily forecasts by climatology.
+    """
+    orders = orders or {}
+    results = run_fits(fit_arima_feature, [(feature, column_name, *orders.get(feature, (p, d, q)), future_days,
+                                            city_name, resolution) for feature, column_name in data.items()],
+                       workers)
+    return merge_feature_results(list(data.columns), results)
+
+
+# Function to fit ARIMA for many cities at once, every city x feature fit sharing one pool
+def arima_forecast_batch(city_data, p, d, q, future_days, workers=None):
+    """city_data maps city names to feature DataFrames; returns {city: (forecasts, summaries, overall_metrics)}."""
+    tasks = [(city, feature) for city, data in city_data.items() for feature in data.columns]
+    results = run_fits(fit_arima_feature, [(feature, city_data[city][feature], p, d, q, future_days, city)
+                                           for city, feature in tasks], workers)
+    return {city: merge_feature_results(list(data.columns),
+                                        [result for (task_city, _), result in zip(tasks, results) if task_city == city])
+            for city, data in city_data.items()}
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import threading
+import time
+from Utils.data_utils import get_lat_lon, fetch_weather_data, next_fetch_start, store_weather_update
+
+# Upper bound on archive downloads running at once across all sessions
+MAX_CONCURRENT_FETCHES = 8
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SECONDS = 3600
+
+_loop = None
+_loop_lock = threading.Lock()
+_fetch_semaphore = None
+_jobs = {}  # (city, till date, folder) -> job
+_jobs_lock = threading.Lock()
+
+
+# Function to get the event loop shared by every session, starting it on first use
+def get_ingest_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ingest-loop", daemon=True).start()
+    return _loop
+
+
+# Async wrappers: the blocking geocode store / cached HTTP client run off the event loop
+async def async_get_lat_lon(city_name):
+    return await asyncio.to_thread(get_lat_lon, city_name)
+
+
+async def async_fetch_weather_data(city_name, latitude, longitude, start_date="1990-01-01", end_date=None):
+    global _fetch_semaphore
+    if _fetch_semaphore is None:
+        _fetch_semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    async with _fetch_semaphore:
+        return await asyncio.to_thread(fetch_weather_data, city_name, latitude, longitude, start_date, end_date)
+
+
+async def _ingest_city(job, city_name, till_date, folder):
+    def report(stage, progress):
+        job["stage"], job["progress"] = stage, progress
+
+    try:
+        report(f"Geocoding {city_name}...", 0.1)
+        latitude, longitude = await async_get_lat_lon(city_name)
+
+        report("Checking stored data...", 0.3)
+        existing_file, start_date = await asyncio.to_thread(next_fetch_start, city_name, folder)
+
+        report(f"Downloading {start_date} to {till_date}...", 0.5)
+        new_data = await async_fetch_weather_data(city_name, latitude, longitude, start_date, till_date)
+
+        report("Saving dataset...", 0.9)
+        _, file_path = await asyncio.to_thread(store_weather_update, city_name, new_data, till_date, folder,
+                                               existing_file)
+        job["file_path"] = file_path
+        report("Done", 1.0)
+    except Exception as e:
+        job["error"] = e
+    finally:
+        job["finished_at"] = time.time()
+        job["done"] = True
+
+
+# Function to start (or join) a background ingestion job for a city
+def start_ingest_job(city_name, till_date, folder="Datasets"):
+    """
+    Schedule geocoding, download and storage of a city on the shared event loop and return immediately.
+    Sessions asking for the same city and date share one job. The returned dict is updated in place with
+    "stage", "progress" (0-1), "done", "file_path" and "error".
+    """
+    city_name = city_name.capitalize()
+    os.makedirs(folder, exist_ok=True)
+    key = (city_name, till_date, folder)
+    with _jobs_lock:
+        now = time.time()
+        for old_key in [k for k, j in _jobs.items() if j["done"] and now - j["finished_at"] > JOB_RETENTION_SECONDS]:
+            del _jobs[old_key]
+
+        job = _jobs.get(key)
+        if job is not None and not (job["done"] and job["error"] is not None):
+            return job
+
+        job = {"stage": "Queued", "progress": 0.0, "done": False, "file_path": None, "error": None,
+               "finished_at": None}
+        _jobs[key] = job
+    asyncio.run_coroutine_threadsafe(_ingest_city(job, city_name, till_date, folder), get_ingest_loop())
+    return job
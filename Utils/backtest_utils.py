@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from Utils.order_search_utils import model_series
+from Utils.parallel_utils import run_fits
+from Utils.resample_utils import disaggregate_forecast, forecast_periods, naive_days
+from Utils.sarima_utils import fourier_terms
+
+# Fewest values (days, weeks or months) parameters are estimated on before the first origin
+MIN_FIT_VALUES = 24
+
+
+def _at(matrix, times):
+    """Columns of a (possibly time-varying) state-space matrix at the given times; last axis is time."""
+    return matrix[..., 0][..., np.newaxis] if matrix.shape[-1] == 1 else matrix[..., times]
+
+
+# Function to compute h-step forecasts from many origins of one filtered model at once
+def origin_forecasts(results, origins, horizon):
+    """
+    results are (fixed-parameter) filter results over the whole series; origins are positions of the last
+    observation each forecast may use. Returns an array (len(origins), horizon) equal to forecasting
+    `horizon` steps after each origin, computed for all origins together from the filtered states.
+    """
+    model = results.filter_results
+    if model.design.shape[-1] != 1 or model.transition.shape[-1] != 1:
+        raise ValueError("Backtesting needs time-invariant design and transition matrices.")
+    design, transition = model.design[0, :, 0], model.transition[:, :, 0]
+
+    origins = np.asarray(origins)
+    states = model.predicted_state[:, origins + 1]  # a(t+1 | t) for every origin, shape (states, origins)
+    forecasts = np.empty((len(origins), horizon))
+    for k in range(1, horizon + 1):
+        forecasts[:, k - 1] = design @ states + _at(model.obs_intercept, origins + k)[0]
+        states = transition @ states + _at(model.state_intercept, origins + k)
+    return forecasts
+
+
+def _build_model(series, model, order, seasonal_order, harmonics):
+    """The state-space model fit_arima_feature / fit_sarima_feature fit on this series."""
+    if model == "arima":
+        return sm.tsa.ARIMA(series, order=order)
+    exog = fourier_terms(series.index, harmonics) if harmonics else None
+    # Fourier mode keeps a constant without differencing, as sm.tsa.ARIMA does
+    trend = ("c" if order[1] == 0 else "n") if harmonics else None
+    return sm.tsa.statespace.SARIMAX(series, exog=exog, order=order, seasonal_order=seasonal_order, trend=trend)
+
+
+def _fit(model):
+    return model.fit() if isinstance(model, sm.tsa.ARIMA) else model.fit(disp=False)
+
+
+# Function to backtest one feature from many forecast origins
+def backtest_feature(series, order=(1, 1, 1), seasonal_order=(0, 0, 0, 0), horizon=7, n_origins=200,
+                     refit_every=0, harmonics=0, model="arima", resolution="D"):
+    """
+    Rolling-origin evaluation of the forecast the ARIMA/SARIMA page makes: the same series (weekly/monthly
+    aggregate, make_stationary for SARIMA, Fourier terms if harmonics > 0; see model_series) and model.
+    Origins are the last n_origins days (weeks, months at those resolutions) that still have `horizon` days of
+    actuals after them and at least MIN_FIT_VALUES values up to them. Parameters are estimated only on data up to the first origin (and again every
+    refit_every origins if refit_every > 0); between estimations the model is just filtered with fixed
+    parameters, and all origins' forecasts come from origin_forecasts. Weekly/monthly forecasts are spread over
+    the days after each origin with disaggregate_forecast.
+    Returns a DataFrame per horizon day with MAE, RMSE and bias against the daily values (as the page's metrics),
+    the MAE of a persistence forecast (last observed day) and the skill against it (1 - MAE / persistence MAE).
+    """
+    series = series.dropna()
+    if harmonics:
+        seasonal_order = (0, 0, 0, 0)
+    values = series.to_numpy(dtype=float)
+    fit_series = model_series(series, series.name, model, resolution, harmonics)
+
+    # Position in the daily series of the last day each fit_series value covers
+    if resolution == "D":
+        last_days = series.index.get_indexer(fit_series.index)
+    else:
+        day_periods = naive_days(series.index).to_period(resolution).asi8
+        last_days = np.searchsorted(day_periods, fit_series.index.to_period(resolution).asi8, side="right") - 1
+    # Periods to forecast from each origin so its horizon days are covered
+    if resolution == "D":
+        periods = horizon
+    else:
+        periods = max((forecast_periods(series.iloc[:day + 1], fit_series.iloc[:i + 1], resolution, horizon)
+                       for i, day in enumerate(last_days)), default=1)
+
+    positions = np.arange(len(fit_series))
+    usable = np.flatnonzero((positions >= MIN_FIT_VALUES - 1) & (positions + periods < len(fit_series))
+                            & (last_days + horizon < len(values)))
+    origins = usable[-n_origins:]
+    if len(origins) == 0:
+        raise ValueError("Series too short to backtest.")
+
+    full_model = _build_model(fit_series, model, order, seasonal_order, harmonics)
+    segment = refit_every if refit_every > 0 else len(origins)
+    forecasts = []
+    for start in range(0, len(origins), segment):
+        segment_origins = origins[start:start + segment]
+        # Estimate on data up to the segment's first origin only, then filter the whole series
+        fitted = _fit(_build_model(fit_series.iloc[:segment_origins[0] + 1], model, order, seasonal_order,
+                                   harmonics))
+        results = full_model.filter(fitted.params)
+        forecasts.append(origin_forecasts(results, segment_origins, periods))
+    forecasts = np.concatenate(forecasts)
+    if resolution != "D":
+        forecasts = np.array([disaggregate_forecast(forecast, series.iloc[:last_days[origin] + 1],
+                                                    fit_series.iloc[:origin + 1], series.name, resolution,
+                                                    horizon).to_numpy()
+                              for origin, forecast in zip(origins, forecasts)])
+
+    # Actuals and persistence forecasts for every origin and horizon, gathered with one index array
+    days = np.arange(1, horizon + 1)
+    origin_days = last_days[origins]
+    actuals = values[origin_days[:, np.newaxis] + days]
+    errors = forecasts - actuals
+    persistence_errors = values[origin_days][:, np.newaxis] - actuals
+
+    mae = np.abs(errors).mean(axis=0)
+    persistence_mae = np.abs(persistence_errors).mean(axis=0)
+    return pd.DataFrame({
+        "Horizon (days)": days,
+        "MAE": mae,
+        "RMSE": np.sqrt((errors ** 2).mean(axis=0)),
+        "Bias": errors.mean(axis=0),
+        "Persistence MAE": persistence_mae,
+        "Skill": 1 - mae / np.where(persistence_mae > 0, persistence_mae, np.nan),
+        "Origins": len(origins),
+    })
+
+
+# Function to backtest every feature of a dataset, features running in parallel
+def backtest_forecasts(data, p, d, q, P=0, D=0, Q=0, m=0, horizon=7, n_origins=200, refit_every=0, harmonics=0,
+                       workers=None, orders=None, model="arima", resolution="D"):
+    """
+    orders maps features to their own ((p, d, q), (P, D, Q, m)), e.g. from auto_orders at the same resolution;
+    model ("arima" or "sarima"), harmonics and resolution are those of the forecast being backtested.
+    Returns {feature: per-horizon DataFrame} (see backtest_feature); failed features map to the error text.
+    """
+    orders = orders or {}
+    tasks = [(data[feature], *orders.get(feature, ((p, d, q), (P, D, Q, m))), horizon, n_origins, refit_every,
+              harmonics, model, resolution) for feature in data.columns]
+    return dict(zip(data.columns, run_fits(_backtest_task, tasks, workers)))
+
+
+def _backtest_task(*args):
+    try:
+        return backtest_feature(*args)
+    except Exception as e:
+        return str(e)
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Result cache settings: an in-memory LRU tier in front of a size-capped disk tier
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", ".result_cache")
+MEMORY_CACHE_ENTRIES = 32
+DISK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+_memory_cache = OrderedDict()
+_lock = threading.Lock()
+_disk_lock = threading.Lock()  # One disk trim at a time
+cache_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+
+# Function to compute a content hash of a dataset
+def dataset_fingerprint(data):
+    """Hash the values, index and column layout of a DataFrame/Series, or the bytes of a NumPy array."""
+    digest = hashlib.sha1()
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        columns = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+        digest.update(repr((columns, [str(dtype) for dtype in np.atleast_1d(data.dtypes)])).encode())
+    else:
+        data = np.ascontiguousarray(data)
+        digest.update(repr((data.shape, str(data.dtype))).encode())
+        digest.update(data.tobytes())
+    return digest.hexdigest()
+
+
+# Function to hash every row of a DataFrame/Series together with its date
+def row_hashes(data):
+    return pd.util.hash_pandas_object(data, index=True).to_numpy()
+
+
+# Function to count the rows appended to a stored dataset since its last date
+def appended_rows(data, stored_hashes, last_date):
+    """
+    data may start later than the stored dataset (a moving history window) but must equal it on every date
+    they share, up to last_date. Returns the number of rows after last_date, or None if the shared dates differ.
+    """
+    if stored_hashes is None or len(data) == 0:
+        return None
+    overlap = data.index.searchsorted(pd.Timestamp(last_date), side="right")
+    if overlap == 0 or overlap > len(stored_hashes) or data.index[overlap - 1] != pd.Timestamp(last_date):
+        return None
+    if not np.array_equal(row_hashes(data.iloc[:overlap]), np.asarray(stored_hashes)[-overlap:]):
+        return None
+    return len(data) - overlap
+
+
+def _remember(key, result):
+    with _lock:
+        _memory_cache[key] = result
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_ENTRIES:
+            _memory_cache.popitem(last=False)
+            cache_stats["evictions"] += 1
+
+
+def _count(stat):
+    with _lock:
+        cache_stats[stat] += 1
+
+
+def _trim_disk_cache():
+    """
+    Delete the least recently used files until the disk tier fits in DISK_CACHE_MAX_BYTES. Files another process
+    removes meanwhile are skipped.
+    """
+    with _disk_lock:
+        entries = []
+        for f in os.listdir(RESULT_CACHE_DIR):
+            if f.endswith(".pkl"):
+                try:
+                    stat = os.stat(os.path.join(RESULT_CACHE_DIR, f))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, f))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, f in sorted(entries):
+            if total_size <= DISK_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(os.path.join(RESULT_CACHE_DIR, f))
+                _count("evictions")
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+# Function to return a cached result, computing and storing it on a miss
+def cached_result(namespace, func, data, *params):
+    """
+    Call func(data, *params) unless a result for the same dataset content and parameters is cached.
+    Lookups go memory first, then disk; disk hits are promoted to memory.
+    """
+    key = hashlib.sha1(repr((namespace, dataset_fingerprint(data), params)).encode()).hexdigest()
+
+    with _lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            cache_stats["memory_hits"] += 1
+            return _memory_cache[key]
+
+    file_path = os.path.join(RESULT_CACHE_DIR, f"{namespace}_{key}.pkl")
+    if os.path.exists(file_path):
+        try:
+            with open(file_path, "rb") as f:
+                result = pickle.load(f)
+            os.utime(file_path)  # Mark as recently used for disk eviction
+            _count("disk_hits")
+            _remember(key, result)
+            return result
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass  # Unreadable entry, recompute it
+
+    _count("misses")
+    result = func(data, *params)
+    _remember(key, result)
+
+    os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+    temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, file_path)
+    _trim_disk_cache()
+    return result
+
+
+# Function to describe the cache state for display
+def cache_summary():
+    hits = cache_stats["memory_hits"] + cache_stats["disk_hits"]
+    lookups = hits + cache_stats["misses"]
+    hit_rate = 100 * hits / lookups if lookups else 0
+    return (f"Result cache: {hits}/{lookups} hits ({hit_rate:.0f}%), "
+            f"{cache_stats['memory_hits']} from memory, {cache_stats['disk_hits']} from disk, "
+            f"{cache_stats['evictions']} evictions")
+
+
+# Function to empty both cache tiers
+def clear_result_cache():
+    with _lock:
+        _memory_cache.clear()
+    if os.path.isdir(RESULT_CACHE_DIR):
+        for f in os.listdir(RESULT_CACHE_DIR):
+            try:
+                os.remove(os.path.join(RESULT_CACHE_DIR, f))
+            except FileNotFoundError:
+                pass
@@ -6,5 +6,13 @@ rename_mapping = {
     "daylight_duration": "Daylight Duration",
     "wind_speed_10m_max": "Max Wind Speed"
 }
+# Daily variables requested from the archive API, in response order
+daily_variables = [
+    "temperature_2m_max", "temperature_2m_min", "temperature_2m_mean",
+    "apparent_temperature_max", "apparent_temperature_min", "apparent_temperature_mean",
+    "daylight_duration", "precipitation_sum", "precipitation_hours", "wind_speed_10m_max"
+]
+# Stored dtype of every daily variable (the API already returns float32)
+dataset_schema = {variable: "float32" for variable in daily_variables}
 # Inverse mapping to recover original names when needed
 inverse_rename_mapping = {v: k for k, v in rename_mapping.items()}
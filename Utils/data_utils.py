@@ -1,50 +1,29 @@
 from datetime import datetime, timedelta
-from geopy.geocoders import Nominatim
 import openmeteo_requests
 import pandas as pd
 import os
-import requests_cache
 from retry_requests import retry
+from Utils.constants import daily_variables
+from Utils.geocode_utils import geocode_city
+from Utils.http_cache_utils import create_cached_session
+from Utils.storage_utils import DATASET_EXTENSIONS, list_city_datasets, load_dataset, save_dataset
 
-# Initialize API client with retry and cache
-cache_session = requests_cache.CachedSession('.cache', expire_after=-1)
+# Archive endpoint, overridable to point ingestion at a local stand-in server
+ARCHIVE_URL = os.environ.get("OPENMETEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+
+# Initialize API client with retry and a bounded, compressed response cache
+cache_session = create_cached_session()
 retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
 openmeteo = openmeteo_requests.Client(session=retry_session)
 
 
 def get_lat_lon(city_name):
-    geolocator = Nominatim(user_agent="weather_app")
-    location = geolocator.geocode(city_name)
-    if location:
-        return location.latitude, location.longitude
-    else:
-        raise ValueError(f"City '{city_name}' not found.")
-
-
-# Function to fetch weather data
-def fetch_weather_data(city_name, latitude, longitude):
-    today = datetime.now()
-    end_date = (today - timedelta(days=1)).strftime("%Y-%m-%d")
-    start_date = "1990-01-01"
+    """Return (latitude, longitude), answered from the persistent geocode store when already resolved."""
+    return geocode_city(city_name)
 
-    # API parameters
-    url = "https://archive-api.open-meteo.com/v1/archive"
-    params = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "start_date": start_date,
-        "end_date": end_date,
-        "daily": [
-            "temperature_2m_max", "temperature_2m_min", "temperature_2m_mean",
-            "apparent_temperature_max", "apparent_temperature_min", "apparent_temperature_mean",
-            "daylight_duration", "precipitation_sum", "precipitation_hours", "wind_speed_10m_max"
-        ],
-        "timezone": "auto"
-    }
-    responses = openmeteo.weather_api(url, params=params)
 
-    # Extract daily data
-    response = responses[0]
+# Function to convert one archive API response into a daily DataFrame
+def response_to_frame(response, start_date):
     daily = response.Daily()
 
     daily_data = {
@@ -54,47 +33,110 @@ def fetch_weather_data(city_name, latitude, longitude):
             freq=pd.Timedelta(seconds=daily.Interval()),
             inclusive="left"
         ),
-        "temperature_2m_max": daily.Variables(0).ValuesAsNumpy(),
-        "temperature_2m_min": daily.Variables(1).ValuesAsNumpy(),
-        "temperature_2m_mean": daily.Variables(2).ValuesAsNumpy(),
-        "apparent_temperature_max": daily.Variables(3).ValuesAsNumpy(),
-        "apparent_temperature_min": daily.Variables(4).ValuesAsNumpy(),
-        "apparent_temperature_mean": daily.Variables(5).ValuesAsNumpy(),
-        "daylight_duration": daily.Variables(6).ValuesAsNumpy(),
-        "precipitation_sum": daily.Variables(7).ValuesAsNumpy(),
-        "precipitation_hours": daily.Variables(8).ValuesAsNumpy(),
-        "wind_speed_10m_max": daily.Variables(9).ValuesAsNumpy(),
     }
+    # Values come back as float32, matching dataset_schema
+    for i, variable in enumerate(daily_variables):
+        daily_data[variable] = daily.Variables(i).ValuesAsNumpy()
 
-    daily_data = pd.DataFrame(daily_data)[daily_data["date"] >= "1990-01-01"]
+    daily_data = pd.DataFrame(daily_data)[daily_data["date"] >= start_date]
     return daily_data
 
 
+# Function to fetch weather data for several locations in one archive request
+def fetch_weather_batch(locations, start_date="1990-01-01", end_date=None):
+    """
+    Fetch the same date range for a list of (latitude, longitude) pairs.
+    The archive API accepts multiple coordinates per request and answers in the same order.
+    """
+    if end_date is None:
+        today = datetime.now()
+        end_date = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    # API parameters
+    params = {
+        "latitude": [latitude for latitude, _ in locations],
+        "longitude": [longitude for _, longitude in locations],
+        "start_date": start_date,
+        "end_date": end_date,
+        "daily": daily_variables,
+        "timezone": "auto"
+    }
+    responses = openmeteo.weather_api(ARCHIVE_URL, params=params)
+    return [response_to_frame(response, start_date) for response in responses]
+
+
+# Function to fetch weather data
+def fetch_weather_data(city_name, latitude, longitude, start_date="1990-01-01", end_date=None):
+    return fetch_weather_batch([(latitude, longitude)], start_date, end_date)[0]
+
+
+# Function to find where the next fetch for a city should start
+def next_fetch_start(city_name, folder):
+    """
+    Return (stored file path or None, start date for the next fetch).
+    Fetches start one day before the last stored date so the timezone offset of stored dates never leaves a gap.
+    """
+    existing_file = list_city_datasets(folder).get(city_name.capitalize())
+    if existing_file is None:
+        return None, "1990-01-01"
+
+    file_path = os.path.join(folder, existing_file)
+    last_date = load_dataset(file_path)["date"].max()
+    return file_path, (last_date - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+# Function to merge newly fetched days into a city's dataset and save it
+def store_weather_update(city_name, new_data, till_date, folder, existing_file=None, export_csv=False):
+    """
+    Replace the stored rows from the first fetched date on with the fetched ones (so refetched days correct
+    provisional or missing archive values) and write the dataset atomically.
+    Older files for the city are removed once the new one is in place.
+    """
+    city_name = city_name.capitalize()
+    if existing_file is None:
+        data = new_data
+    else:
+        data = load_dataset(existing_file)
+        if len(new_data):
+            data = data[data["date"] < new_data["date"].min()]
+        data = pd.concat([data, new_data], ignore_index=True)
+
+    file_path = save_dataset(data, city_name, till_date, folder, export_csv=export_csv)
+    keep_files = {os.path.basename(file_path)}
+    if export_csv:
+        keep_files.add(f"{city_name}_{till_date}.csv")
+
+    # Remove the stale datasets for this city
+    for file in os.listdir(folder):
+        if file.startswith(f"{city_name}_") and file not in keep_files:
+            os.remove(os.path.join(folder, file))
+    return data, file_path
+
+
 # Overwrite Check Function
 def check_and_get_file(city_name, till_date, folder):
     """
     Check for an existing dataset for the city with the correct date.
-    Return the file path if it exists; otherwise, delete older datasets.
+    Return the file path if it exists; older datasets are kept so they can be updated incrementally.
     """
     city_name = city_name.capitalize()
     existing_files = [f for f in os.listdir(folder) if city_name in f]
-    current_file = f"{city_name}_{till_date}.csv"
-
-    # Check if the file with the same date already exists
-    if current_file in existing_files:
-        return os.path.join(folder, current_file)  # Return the existing file path
 
-    # If old files exist with different dates, delete them
-    for file in existing_files:
-        os.remove(os.path.join(folder, file))
-    return None  # No current file found, proceed to fetch new data
+    # Check if the file with the same date already exists (columnar store first, then CSV)
+    for extension in DATASET_EXTENSIONS:
+        current_file = f"{city_name}_{till_date}{extension}"
+        if current_file in existing_files:
+            return os.path.join(folder, current_file)  # Return the existing file path
+    return None  # No current file found, proceed to fetch the missing data
 
 
 def clean_data(data):
     """
     Handle missing values in the dataset.
     - Drop rows with NaN or fill missing values using interpolation.
+    - Column dtypes (float32 per dataset_schema) are kept.
     """
+    dtypes = data.dtypes
     if data.isnull().values.any():
         print("Missing values detected. Cleaning the data...")
         # Fill missing values using interpolation
@@ -107,4 +149,4 @@ def clean_data(data):
             print("Warning: Some missing values remain after cleaning.")
         else:
             print("Data cleaned successfully.")
-    return data
+    return data.astype(dtypes, copy=False)
@@ -0,0 +1,148 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+from geopy.distance import distance
+from geopy.exc import GeopyError
+from geopy.extra.rate_limiter import RateLimiter
+from geopy.geocoders import Nominatim
+
+# Persistent geocode store and Nominatim endpoint (overridable for offline runs)
+GEOCODE_CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", ".geocode_cache.sqlite")
+NOMINATIM_DOMAIN = os.environ.get("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+NOMINATIM_SCHEME = os.environ.get("NOMINATIM_SCHEME", "https")
+
+# Nominatim usage policy: at most one request per second from the whole application
+NOMINATIM_MIN_DELAY_SECONDS = 1
+# How long (seconds) a negative result is kept before Nominatim is asked again
+NEGATIVE_TTL = {
+    "not_found": 30 * 24 * 3600,
+    "error": 3600
+}
+NEGATIVE_MESSAGES = {
+    "not_found": "not found",
+    "error": "could not be geocoded"
+}
+# Two candidates this close in importance but this far apart make a name ambiguous (the top one is used)
+AMBIGUOUS_IMPORTANCE_GAP = 0.05
+AMBIGUOUS_DISTANCE_KM = 100
+
+_memory_cache = {}  # normalized name -> (status, latitude, longitude, expires_at)
+_cache_loaded = False
+_lock = threading.Lock()
+_geocode = None  # Rate-limited Nominatim lookup, created on first use
+_request_lock = threading.Lock()  # One Nominatim request at a time across threads
+
+
+def normalize_city_name(city_name):
+    """Key used for the geocode store: case-insensitive with collapsed whitespace."""
+    return " ".join(city_name.split()).casefold()
+
+
+def _connect():
+    connection = sqlite3.connect(GEOCODE_CACHE_PATH)
+    connection.execute("CREATE TABLE IF NOT EXISTS geocodes (name TEXT PRIMARY KEY, status TEXT, "
+                       "latitude REAL, longitude REAL, expires_at REAL)")
+    return connection
+
+
+def _load_cache():
+    global _cache_loaded
+    if _cache_loaded:
+        return
+    connection = _connect()
+    for name, status, latitude, longitude, expires_at in connection.execute("SELECT * FROM geocodes"):
+        _memory_cache[name] = (status, latitude, longitude, expires_at)
+    connection.close()
+    _cache_loaded = True
+
+
+def _store(entries):
+    """Save {name: (status, latitude, longitude, expires_at)} to memory and to the persistent store."""
+    with _lock:
+        _load_cache()
+        _memory_cache.update(entries)
+        connection = _connect()
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?)",
+                                   [(name, *entry) for name, entry in entries.items()])
+        connection.close()
+
+
+# Function to preload coordinates from a local gazetteer file
+def load_gazetteer(file_path):
+    """Load a CSV with city, latitude and longitude columns into the geocode store. Returns the row count."""
+    entries = {}
+    with open(file_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            entries[normalize_city_name(row["city"])] = ("found", float(row["latitude"]),
+                                                          float(row["longitude"]), None)
+    _store(entries)
+    return len(entries)
+
+
+def _is_ambiguous(locations):
+    if len(locations) < 2:
+        return False
+    first, second = locations[0], locations[1]
+    importance_gap = abs(first.raw.get("importance", 0) - second.raw.get("importance", 0))
+    far_apart = distance(first.point, second.point).km > AMBIGUOUS_DISTANCE_KM
+    return importance_gap < AMBIGUOUS_IMPORTANCE_GAP and far_apart
+
+
+def _cached(key):
+    """The stored (latitude, longitude), the stored negative status, or None if Nominatim must be asked."""
+    with _lock:
+        _load_cache()
+        entry = _memory_cache.get(key)
+    if entry is None:
+        return None
+    status, latitude, longitude, expires_at = entry
+    if status == "found":
+        return latitude, longitude
+    # Older stores may hold statuses that are no longer cached (e.g. "ambiguous")
+    if status in NEGATIVE_MESSAGES and expires_at is not None and expires_at > time.time():
+        return status
+    return None
+
+
+def _lookup(city_name):
+    global _geocode
+    if _geocode is None:
+        geolocator = Nominatim(user_agent="weather_app", domain=NOMINATIM_DOMAIN, scheme=NOMINATIM_SCHEME)
+        _geocode = RateLimiter(geolocator.geocode, min_delay_seconds=NOMINATIM_MIN_DELAY_SECONDS,
+                               swallow_exceptions=False)
+    return _geocode(city_name, exactly_one=False, limit=2)
+
+
+# Function to look up a city's coordinates, answering from the store whenever possible
+def geocode_city(city_name):
+    """
+    Uncached names are sent to Nominatim one at a time, at most one request per second. When the two best
+    matches are about as important but far apart, the top one is used and a warning is printed.
+    """
+    key = normalize_city_name(city_name)
+    cached = _cached(key)
+    if cached is None:
+        with _request_lock:
+            # Another thread may have looked the name up while this one waited
+            cached = _cached(key)
+            if cached is None:
+                try:
+                    locations = _lookup(city_name)
+                except GeopyError as e:
+                    _store({key: ("error", None, None, time.time() + NEGATIVE_TTL["error"])})
+                    raise ValueError(f"Geocoding '{city_name}' failed: {e}")
+
+                if not locations:
+                    _store({key: ("not_found", None, None, time.time() + NEGATIVE_TTL["not_found"])})
+                    raise ValueError(f"City '{city_name}' {NEGATIVE_MESSAGES['not_found']}.")
+                if _is_ambiguous(locations):
+                    print(f"Warning: '{city_name}' is ambiguous, using {locations[0].address}.")
+                cached = (locations[0].latitude, locations[0].longitude)
+                _store({key: ("found", *cached, None)})
+
+    if isinstance(cached, str):
+        raise ValueError(f"City '{city_name}' {NEGATIVE_MESSAGES[cached]} (cached).")
+    return cached
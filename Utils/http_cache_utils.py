@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from functools import partial
+import requests_cache
+from requests_cache import SerializerPipeline, Stage, pickle_serializer
+
+# HTTP response cache settings (overridable through the environment)
+HTTP_CACHE_NAME = os.environ.get("HTTP_CACHE_NAME", ".cache")
+HTTP_CACHE_TTL = int(os.environ.get("HTTP_CACHE_TTL", 7 * 24 * 3600))  # seconds
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Responses are pickled and then zlib-compressed before they are written to SQLite
+compressed_serializer = SerializerPipeline([pickle_serializer, Stage(dumps=zlib.compress, loads=zlib.decompress)],
+                                           name="zlib_pickle", is_binary=True)
+
+http_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_lock = threading.Lock()
+
+
+def _connect(session):
+    connection = sqlite3.connect(session.cache.responses.db_path, timeout=30)
+    connection.execute("CREATE TABLE IF NOT EXISTS http_cache_access (key TEXT PRIMARY KEY, accessed REAL)")
+    return connection
+
+
+# Function to evict expired and least recently used responses until the cache fits its size cap
+def trim_http_cache(session, max_bytes=HTTP_CACHE_MAX_BYTES):
+    """Returns the number of evicted responses."""
+    with _lock:
+        session.cache.delete(expired=True, vacuum=False)
+
+        connection = _connect(session)
+        rows = connection.execute(
+            "SELECT r.key, LENGTH(r.value) FROM responses r LEFT JOIN http_cache_access a ON a.key = r.key "
+            "ORDER BY COALESCE(a.accessed, r.expires - ?, 0)", (HTTP_CACHE_TTL,)).fetchall()
+        total_size = sum(size or 0 for _, size in rows)
+
+        evicted = []
+        for key, size in rows:
+            if total_size <= max_bytes:
+                break
+            evicted.append(key)
+            total_size -= size or 0
+
+        if evicted:
+            session.cache.delete(*evicted, vacuum=True)
+            with connection:
+                connection.executemany("DELETE FROM http_cache_access WHERE key = ?", [(key,) for key in evicted])
+            http_cache_stats["evictions"] += len(evicted)
+        connection.close()
+    return len(evicted)
+
+
+def _record_access(session, max_bytes, response, *args, **kwargs):
+    """Response hook: count hits/misses, remember when each entry was last used and enforce the size cap."""
+    if not hasattr(response, "from_cache"):
+        return response  # Inner dispatch of a miss, before requests_cache has stored the response
+    http_cache_stats["hits" if response.from_cache else "misses"] += 1
+
+    with _lock:
+        connection = _connect(session)
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO http_cache_access VALUES (?, ?)",
+                                (response.cache_key, time.time()))
+        connection.close()
+
+    # A miss has just added a response, so make sure the cache still fits
+    if not response.from_cache:
+        trim_http_cache(session, max_bytes)
+    return response
+
+
+# Function to create the cached HTTP session used by the Open-Meteo client
+def create_cached_session(cache_name=HTTP_CACHE_NAME, expire_after=HTTP_CACHE_TTL, max_bytes=HTTP_CACHE_MAX_BYTES):
+    """
+    SQLite-backed response cache with compressed payloads, a TTL and a size cap.
+    When the cap is exceeded the least recently used responses are evicted first.
+    """
+    session = requests_cache.CachedSession(cache_name, backend="sqlite", serializer=compressed_serializer,
+                                           expire_after=expire_after)
+    session.hooks["response"].append(partial(_record_access, session, max_bytes))
+    return session
+
+
+# Function to describe the cache state for display
+def http_cache_summary(session):
+    lookups = http_cache_stats["hits"] + http_cache_stats["misses"]
+    hit_rate = 100 * http_cache_stats["hits"] / lookups if lookups else 0
+    size_mb = session.cache.responses.size() / (1024 * 1024)
+    return (f"HTTP cache: {http_cache_stats['hits']}/{lookups} hits ({hit_rate:.0f}%), "
+            f"{session.cache.responses.count()} responses, {size_mb:.1f} MB, "
+            f"{http_cache_stats['evictions']} evictions")
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+import os
+from Utils.data_utils import get_lat_lon, fetch_weather_batch, next_fetch_start, store_weather_update
+
+
+# Function to parse a city given as "Name" or "Name:latitude,longitude"
+def parse_city(spec):
+    if not isinstance(spec, str):
+        name, latitude, longitude = spec
+        return name.capitalize(), (float(latitude), float(longitude))
+
+    name, _, coordinates = spec.partition(":")
+    if coordinates:
+        latitude, longitude = coordinates.split(",")
+        return name.strip().capitalize(), (float(latitude), float(longitude))
+    return name.strip().capitalize(), None
+
+
+# Function to geocode a city (if needed) and work out which days it is missing
+def resolve_city(city_name, location, folder):
+    if location is None:
+        location = get_lat_lon(city_name)
+    existing_file, start_date = next_fetch_start(city_name, folder)
+    return city_name, location, existing_file, start_date
+
+
+# Function to download one batch of cities in a single archive request and store each city
+def fetch_and_store_batch(batch, start_date, till_date, folder, export_csv=False):
+    frames = fetch_weather_batch([location for _, location, _ in batch], start_date, till_date)
+    results = {}
+    for (city_name, _, existing_file), frame in zip(batch, frames):
+        try:
+            _, file_path = store_weather_update(city_name, frame, till_date, folder, existing_file, export_csv)
+            results[city_name] = file_path
+        except Exception as e:
+            results[city_name] = e
+    return results
+
+
+# Function to ingest many cities concurrently
+def ingest_cities(cities, folder="Datasets", till_date=None, batch_size=10, max_workers=4, export_csv=False,
+                  on_result=None):
+    """
+    Fetch and store datasets for a list of cities ("Name", "Name:lat,lon" or (name, lat, lon)).
+    - Geocoding and archive downloads overlap on one bounded thread pool.
+    - Cities missing the same date range are sent together, up to batch_size locations per archive request.
+    - Each city is written as soon as its batch returns; on_result(city, file path or exception) is called then.
+    Returns {city: file path or the exception that stopped it}.
+    """
+    if till_date is None:
+        till_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    os.makedirs(folder, exist_ok=True)
+
+    results = {}
+    pending = {}  # future -> ("resolve" | "fetch", city names)
+    batches = {}  # start date -> [(city, location, existing file)]
+
+    def report(city_name, outcome):
+        results[city_name] = outcome
+        if on_result is not None:
+            on_result(city_name, outcome)
+
+    def submit_batch(start_date, batch):
+        future = pool.submit(fetch_and_store_batch, batch, start_date, till_date, folder, export_csv)
+        pending[future] = ("fetch", [city_name for city_name, _, _ in batch])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for spec in cities:
+            city_name, location = parse_city(spec)
+            pending[pool.submit(resolve_city, city_name, location, folder)] = ("resolve", [city_name])
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, city_names = pending.pop(future)
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    for city_name in city_names:
+                        report(city_name, e)
+                    continue
+
+                if kind == "fetch":
+                    for city_name, file_outcome in outcome.items():
+                        report(city_name, file_outcome)
+                    continue
+
+                city_name, location, existing_file, start_date = outcome
+                if existing_file and os.path.basename(existing_file).startswith(f"{city_name}_{till_date}."):
+                    report(city_name, existing_file)  # Already up to date
+                    continue
+
+                batch = batches.setdefault(start_date, [])
+                batch.append((city_name, location, existing_file))
+                if len(batch) >= batch_size:
+                    submit_batch(start_date, batches.pop(start_date))
+
+            # Once every city is resolved, send the partially filled batches
+            if not any(kind == "resolve" for kind, _ in pending.values()):
+                for start_date, batch in batches.items():
+                    submit_batch(start_date, batch)
+                batches.clear()
+    return results
@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+import numpy as np
+import pandas as pd
+from Utils.constants import rename_mapping
+from Utils.data_utils import clean_data
+from Utils.lstm_utils import LSTMTrainingConfig, TrainingProfiler, fit_lstm_model
+from Utils.storage_utils import list_city_datasets, load_dataset
+
+
+def _benchmark_config(config, file_path, n_steps):
+    """Train once with config (in a fresh process) and summarise the per-epoch measurements."""
+    data = load_dataset(file_path).set_index("date")[list(rename_mapping.keys())]
+    data = clean_data(data).values
+    n_train = len(data) - n_steps - int(np.ceil(0.2 * (len(data) - n_steps)))
+    profiler = TrainingProfiler(n_train, verbose=False)
+    _, _, train_loss, test_loss, r2 = fit_lstm_model(data, n_steps, config, [profiler])
+
+    # The first epoch includes tracing/compilation; report it separately
+    epochs = pd.DataFrame(profiler.epochs)
+    steady = epochs.iloc[1:] if len(epochs) > 1 else epochs
+    return {
+        "samples_per_sec": steady["samples_per_sec"].mean(),
+        "step_ms": steady["step_ms"].mean(),
+        "first_epoch_seconds": epochs["epoch_seconds"].iloc[0],
+        "peak_memory_mb": epochs["peak_memory_mb"].max(),
+        "epochs_run": len(epochs),
+        "train_loss": train_loss,
+        "test_loss": test_loss,
+        "r2": r2,
+    }
+
+
+# Function to compare training configurations on the bundled Bangalore dataset
+def benchmark_lstm_training(configs, city="Bangalore", folder="Datasets", n_steps=30):
+    """
+    Train once per LSTMTrainingConfig, each in its own spawned process so thread settings apply and peak memory
+    is measured per configuration. Returns a DataFrame of the settings with samples/sec (after the first
+    epoch), step time, first-epoch time, peak memory and the resulting losses, fastest first.
+    """
+    file_path = os.path.join(folder, list_city_datasets(folder)[city])
+    rows = []
+    for config in configs:
+        # Early stopping off, so every configuration runs the same number of epochs
+        config = replace(config, patience=config.epochs, profile=False)
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(_benchmark_config, config, file_path, n_steps).result()
+        rows.append(dict(asdict(config), **result))
+        print(f"{config}: {result['samples_per_sec']:.0f} samples/s, {result['step_ms']:.1f} ms/step")
+    return pd.DataFrame(rows).sort_values("samples_per_sec", ascending=False).reset_index(drop=True)
+
+
+# Function to build every combination of the given settings as training configs
+def config_grid(base=None, **options):
+    """config_grid(batch_size=[32, 128], activation=["relu", "tanh"]) -> 4 configs based on base."""
+    configs = [base or LSTMTrainingConfig()]
+    for name, values in options.items():
+        configs = [replace(config, **{name: value}) for config in configs for value in values]
+    return configs
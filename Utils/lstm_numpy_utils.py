@@ -0,0 +1,107 @@
+import os
+import numpy as np
+
+# Forecasting from exported weights needs only NumPy: this module must not import TensorFlow
+
+# Activations the exported LSTM may use, by their Keras names
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0),
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "hard_sigmoid": lambda x: np.clip(x / 6 + 0.5, 0, 1),
+    "linear": lambda x: x,
+}
+
+
+def _activation_name(activation):
+    return activation if isinstance(activation, str) else activation.__name__
+
+
+# Function to export a trained Keras LSTM (and its scaler) to a plain .npz array file
+def export_lstm_weights(model, scaler, file_path):
+    """
+    Works for models from build_lstm_model, with or without a city embedding (Dropout is a no-op at inference).
+    The scaler may be None; forecasts then stay in scaled units.
+    """
+    arrays = {}
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == "Embedding":
+            arrays["embedding"] = layer.get_weights()[0]
+        elif kind == "LSTM":
+            arrays["kernel"], arrays["recurrent_kernel"], arrays["bias"] = layer.get_weights()
+            arrays["activation"] = np.array(_activation_name(layer.activation))
+            arrays["recurrent_activation"] = np.array(_activation_name(layer.recurrent_activation))
+        elif kind == "Dense":
+            arrays["dense_kernel"], arrays["dense_bias"] = layer.get_weights()
+    arrays["n_steps"] = np.array(model.inputs[0].shape[1])
+    if scaler is not None:
+        arrays["scale"], arrays["min"] = scaler.scale_, scaler.min_
+
+    # Write next to the target and swap in, so readers never see a partial file
+    tmp_path = file_path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, file_path)
+
+
+# Function to load exported LSTM weights
+def load_lstm_weights(file_path):
+    with np.load(file_path) as f:
+        weights = {name: f[name] for name in f.files}
+    weights["activation"] = str(weights["activation"])
+    weights["recurrent_activation"] = str(weights["recurrent_activation"])
+    weights["n_steps"] = int(weights["n_steps"])
+    return weights
+
+
+# Function to run the LSTM and Dense layers on a batch of scaled windows
+def lstm_forward(weights, windows, city_ids=None):
+    """windows has shape (batch, n_steps, features); returns the next scaled row of each, (batch, features)."""
+    windows = np.asarray(windows, dtype=np.float32)
+    if "embedding" in weights:
+        city_ids = np.zeros(len(windows), dtype=int) if city_ids is None else np.asarray(city_ids)
+        embedded = np.broadcast_to(weights["embedding"][city_ids][:, np.newaxis],
+                                   (len(windows), windows.shape[1], weights["embedding"].shape[1]))
+        windows = np.concatenate([windows, embedded], axis=2)
+
+    activation = ACTIVATIONS[weights["activation"]]
+    recurrent_activation = ACTIVATIONS[weights["recurrent_activation"]]
+    units = weights["recurrent_kernel"].shape[0]
+
+    # Input projections for every step at once; only the recurrent part is sequential
+    projected = windows @ weights["kernel"] + weights["bias"]
+    h = np.zeros((len(windows), units), dtype=np.float32)
+    c = np.zeros_like(h)
+    for step in range(windows.shape[1]):
+        z = projected[:, step] + h @ weights["recurrent_kernel"]
+        # Keras gate order: input, forget, cell, output
+        i = recurrent_activation(z[:, :units])
+        f = recurrent_activation(z[:, units:2 * units])
+        c = f * c + i * activation(z[:, 2 * units:3 * units])
+        h = recurrent_activation(z[:, 3 * units:]) * activation(c)
+    return h @ weights["dense_kernel"] + weights["dense_bias"]
+
+
+# Function to forecast future days with exported weights, without TensorFlow
+def numpy_lstm_forecast(weights, data, future_days=7, city_ids=None):
+    """
+    data is one series of shape (time, features) or a batch of series (batch, time, features) in original
+    units; the last n_steps rows of each are rolled forward autoregressively, as make_lstm_forecaster does.
+    Returns (future_days, features), or (batch, future_days, features) for a batch.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    single = data.ndim == 2
+    windows = data[np.newaxis, -weights["n_steps"]:] if single else data[:, -weights["n_steps"]:]
+    if "scale" in weights:
+        windows = windows * weights["scale"] + weights["min"]
+
+    predictions = []
+    for _ in range(future_days):
+        prediction = lstm_forward(weights, windows, city_ids)
+        predictions.append(prediction)
+        windows = np.concatenate([windows[:, 1:], prediction[:, np.newaxis]], axis=1)
+    forecast = np.stack(predictions, axis=1)
+
+    if "scale" in weights:
+        forecast = (forecast - weights["min"]) / weights["scale"]
+    return forecast[0] if single else forecast
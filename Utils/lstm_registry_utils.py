@@ -0,0 +1,195 @@
+import json
+import os
+import pickle
+import shutil
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from Utils.cache_utils import appended_rows, dataset_fingerprint, row_hashes
+from Utils.lstm_numpy_utils import export_lstm_weights
+from Utils.lstm_utils import (evaluate_lstm_model, fit_lstm_model, forecast_lstm_model, make_lstm_forecaster,
+                              prepare_lstm_data, split_windows)
+
+# Saved models, one folder per city: model.keras, scaler.pkl, metadata.json, row_hashes.npy (to match later
+# data) and weights.npz (for TensorFlow-free serving with Utils.lstm_numpy_utils)
+LSTM_MODEL_DIR = os.path.join("Assets", "LSTM", "Models")
+# Warm start settings: epochs run on new days, and how many days from before the holdout are replayed with them
+FINE_TUNE_EPOCHS = 3
+FINE_TUNE_CONTEXT_DAYS = 365
+# After this many warm starts the next update retrains from scratch (the scaler is never refitted otherwise)
+MAX_FINE_TUNES = 30
+
+_loaded_models = {}  # (folder, city) -> (metadata, model, scaler, forecaster)
+_lock = threading.Lock()
+
+
+def _model_folder(city_name, folder=LSTM_MODEL_DIR):
+    return os.path.join(folder, city_name)
+
+
+# Function to save a city's model, scaler and training metadata
+def save_lstm_entry(city_name, model, scaler, metadata, folder=LSTM_MODEL_DIR, hashes=None):
+    """
+    hashes are the row hashes of the training data (see row_hashes). Files are written under temporary names
+    and swapped in; metadata.json goes last and marks the entry valid.
+    Returns the in-memory entry (metadata, model, scaler, forecaster).
+    """
+    model_folder = _model_folder(city_name, folder)
+    os.makedirs(model_folder, exist_ok=True)
+
+    model.save(os.path.join(model_folder, "model.tmp.keras"))
+    with open(os.path.join(model_folder, "scaler.pkl.tmp"), "wb") as f:
+        pickle.dump(scaler, f)
+    export_lstm_weights(model, scaler, os.path.join(model_folder, "weights.tmp.npz"))
+    if hashes is not None:
+        with open(os.path.join(model_folder, "row_hashes.npy.tmp"), "wb") as f:
+            np.save(f, hashes)
+    with open(os.path.join(model_folder, "metadata.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+    os.replace(os.path.join(model_folder, "model.tmp.keras"), os.path.join(model_folder, "model.keras"))
+    os.replace(os.path.join(model_folder, "scaler.pkl.tmp"), os.path.join(model_folder, "scaler.pkl"))
+    os.replace(os.path.join(model_folder, "weights.tmp.npz"), os.path.join(model_folder, "weights.npz"))
+    if hashes is not None:
+        os.replace(os.path.join(model_folder, "row_hashes.npy.tmp"), os.path.join(model_folder, "row_hashes.npy"))
+    os.replace(os.path.join(model_folder, "metadata.json.tmp"), os.path.join(model_folder, "metadata.json"))
+
+    entry = (metadata, model, scaler, make_lstm_forecaster(model))
+    with _lock:
+        _loaded_models[(folder, city_name)] = entry
+    return entry
+
+
+# Function to load a city's saved entry, or None if there is none
+def load_lstm_entry(city_name, folder=LSTM_MODEL_DIR):
+    """Returns (metadata, model, scaler, forecaster); models stay in memory until their metadata changes."""
+    metadata_path = os.path.join(_model_folder(city_name, folder), "metadata.json")
+    if not os.path.exists(metadata_path):
+        return None
+    with open(metadata_path, encoding="utf-8") as f:
+        metadata = json.load(f)
+
+    with _lock:
+        entry = _loaded_models.get((folder, city_name))
+    if entry is not None and entry[0] == metadata:
+        return entry
+
+    model_folder = _model_folder(city_name, folder)
+    try:
+        model = tf.keras.models.load_model(os.path.join(model_folder, "model.keras"))
+        with open(os.path.join(model_folder, "scaler.pkl"), "rb") as f:
+            scaler = pickle.load(f)
+    except Exception as e:
+        print(f"Could not load saved LSTM model for {city_name}: {e}")
+        return None
+
+    entry = (metadata, model, scaler, make_lstm_forecaster(model))
+    with _lock:
+        _loaded_models[(folder, city_name)] = entry
+    return entry
+
+
+# Function to delete a city's saved model
+def delete_lstm_entry(city_name, folder=LSTM_MODEL_DIR):
+    with _lock:
+        _loaded_models.pop((folder, city_name), None)
+    shutil.rmtree(_model_folder(city_name, folder), ignore_errors=True)
+
+
+def _data_metadata(data, n_steps):
+    return {
+        "n_steps": n_steps,
+        "features": list(data.columns),
+        "first_date": str(data.index[0]),
+        "last_date": str(data.index[-1]),
+        "rows": len(data),
+        "fingerprint": dataset_fingerprint(data),
+    }
+
+
+def _new_days(metadata, data, city_name, folder):
+    """
+    Number of rows data has after the saved training data, or None unless data is that data with rows appended.
+    The start may move forward (a "years of history" window) as long as the shared dates are unchanged.
+    """
+    hashes_path = os.path.join(_model_folder(city_name, folder), "row_hashes.npy")
+    if not os.path.exists(hashes_path):
+        return None
+    return appended_rows(data, np.load(hashes_path), metadata["last_date"])
+
+
+# Function to find the holdout of a full training: the days its test windows predict
+def _holdout_dates(data, n_steps):
+    n_windows = len(data) - n_steps
+    n_test = len(split_windows(np.arange(n_windows), np.arange(n_windows))[1])
+    return [str(data.index[-n_test]), str(data.index[-1])]
+
+
+# Function to fine-tune a saved model on the days that arrived since it was trained
+def fine_tune_lstm_model(model, scaler, data, new_rows, holdout, n_steps=30, epochs=FINE_TUNE_EPOCHS):
+    """
+    holdout is the (first, last) date the full training's test windows predict. Those windows are never trained
+    on: a few epochs run on the windows predicting the new_rows new days plus FINE_TUNE_CONTEXT_DAYS windows
+    from before the holdout, keeping the saved scaler, and the model is then scored on the holdout windows.
+    Returns the final train loss, the holdout loss and the holdout R^2.
+    """
+    scaled_data = scaler.transform(np.asarray(data.values, dtype=np.float32))
+    X, y = prepare_lstm_data(scaled_data, n_steps)
+    targets = data.index[n_steps:n_steps + len(X)]
+    held_out = (targets >= pd.Timestamp(holdout[0])) & (targets <= pd.Timestamp(holdout[1]))
+    if not held_out.any():
+        raise ValueError("No holdout windows left in the data.")
+
+    context = np.flatnonzero(targets < pd.Timestamp(holdout[0]))[-FINE_TUNE_CONTEXT_DAYS:]
+    train = np.concatenate([context, np.arange(len(X) - new_rows, len(X))])
+    history = model.fit(X[train], y[train], epochs=epochs, verbose=0)
+
+    X_test, y_test = X[held_out], y[held_out]
+    test_loss = model.evaluate(X_test, y_test, verbose=0)
+    r2 = evaluate_lstm_model(model, scaler, X_test, y_test)
+    return history.history['loss'][-1], test_loss, r2
+
+
+# Function to forecast a city from its saved model, fine-tuning or retraining only when the data changed
+def serve_lstm_forecast(data, city_name, future_days=7, n_steps=30, folder=LSTM_MODEL_DIR):
+    """
+    data is the cleaned feature DataFrame indexed by date.
+    - same data as the saved model was trained on (or only older days dropped): forecast with it directly;
+    - only new days appended (the start may also move forward): fine-tune for FINE_TUNE_EPOCHS on them and save;
+      the reported losses and R^2 then come from the full training's test days, which fine-tuning never uses;
+    - anything else (new city, other history window or features, edited rows): train from scratch and save.
+    Returns (train loss, test loss, forecast, R^2 %, status) where status is "served", "fine-tuned" or "trained".
+    """
+    metadata = _data_metadata(data, n_steps)
+    entry = load_lstm_entry(city_name, folder)
+    saved = entry[0] if entry is not None else None
+    compatible = saved is not None and saved["n_steps"] == n_steps and saved["features"] == metadata["features"]
+
+    new_rows = None
+    if compatible:
+        new_rows = 0 if saved["fingerprint"] == metadata["fingerprint"] else _new_days(saved, data, city_name, folder)
+    if new_rows == 0:
+        _, model, scaler, forecaster = entry
+        forecast = forecast_lstm_model(model, scaler, data.values, future_days, n_steps, forecaster)
+        return saved["train_loss"], saved["test_loss"], forecast, saved["r2"], "served"
+
+    holdout = saved.get("holdout") if compatible else None
+    if new_rows and holdout and saved.get("fine_tunes", 0) < MAX_FINE_TUNES \
+            and pd.Timestamp(holdout[0]) >= data.index[n_steps]:
+        _, model, scaler, _ = entry
+        train_loss, test_loss, r2 = fine_tune_lstm_model(model, scaler, data, new_rows, holdout, n_steps)
+        metadata.update(trained_at=saved["trained_at"], fine_tunes=saved.get("fine_tunes", 0) + 1, holdout=holdout)
+        status = "fine-tuned"
+    else:
+        model, scaler, train_loss, test_loss, r2 = fit_lstm_model(data.values, n_steps)
+        metadata.update(trained_at=datetime.now().isoformat(timespec="seconds"), fine_tunes=0,
+                        holdout=_holdout_dates(data, n_steps))
+        status = "trained"
+
+    metadata.update(updated_at=datetime.now().isoformat(timespec="seconds"), train_loss=float(train_loss),
+                    test_loss=float(test_loss), r2=round(r2 * 100))
+    forecaster = save_lstm_entry(city_name, model, scaler, metadata, folder, row_hashes(data))[3]
+    forecast = forecast_lstm_model(model, scaler, data.values, future_days, n_steps, forecaster)
+    return metadata["train_loss"], metadata["test_loss"], forecast, metadata["r2"], status
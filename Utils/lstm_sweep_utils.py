@@ -0,0 +1,128 @@
+import itertools
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from sklearn.preprocessing import MinMaxScaler
+from tensorflow.keras.callbacks import EarlyStopping
+from Utils.constants import rename_mapping
+from Utils.data_utils import clean_data
+from Utils.lstm_utils import build_lstm_model, prepare_lstm_data, split_windows
+from Utils.storage_utils import load_dataset
+
+# Default search space; every combination is one trial
+SWEEP_GRID = {
+    "n_steps": [14, 30, 60],
+    "units": [32, 50, 100],
+    "dropout": [0.0, 0.2, 0.4],
+}
+SWEEP_DIR = os.path.join("Assets", "LSTM", "Sweeps")
+
+_worker_data = {}  # (file path, years) -> scaled series, kept for the life of a worker process
+
+
+def _init_worker(intra_op_threads, inter_op_threads):
+    """Pin TensorFlow's thread pools before the worker runs its first op, so workers don't oversubscribe cores."""
+    os.environ["OMP_NUM_THREADS"] = str(intra_op_threads)
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def _scaled_series(file_path, last_n_years):
+    key = (file_path, last_n_years)
+    if key not in _worker_data:
+        data = load_dataset(file_path, last_n_years=last_n_years).set_index("date")[list(rename_mapping.keys())]
+        data = np.asarray(clean_data(data).values, dtype=np.float32)
+        _worker_data[key] = MinMaxScaler(feature_range=(0, 1)).fit_transform(data)
+    return _worker_data[key]
+
+
+def _run_trial(trial, file_path, last_n_years, start_epoch, end_epoch, patience, batch_size, folder):
+    """
+    Train one trial from start_epoch up to end_epoch, resuming from its checkpoint, with early stopping.
+    Returns the trial dict updated with its best validation loss, epochs run and whether it stopped early.
+    """
+    started = time.perf_counter()
+    scaled_data = _scaled_series(file_path, last_n_years)
+    X_train, X_test, y_train, y_test = split_windows(*prepare_lstm_data(scaled_data, trial["n_steps"]))
+
+    checkpoint = os.path.join(folder, f"trial_{trial['trial']}.keras")
+    if start_epoch and os.path.exists(checkpoint):
+        model = tf.keras.models.load_model(checkpoint)
+    else:
+        model = build_lstm_model(trial["n_steps"], scaled_data.shape[1], units=trial["units"],
+                                 dropout=trial["dropout"])
+
+    early_stop = EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)
+    history = model.fit(X_train, y_train, initial_epoch=start_epoch, epochs=end_epoch, batch_size=batch_size,
+                        verbose=0, validation_data=(X_test, y_test), callbacks=[early_stop])
+    model.save(checkpoint)
+
+    epochs_run = start_epoch + len(history.history['loss'])
+    best_val_loss = min(history.history['val_loss'])
+    return dict(trial, val_loss=min(best_val_loss, trial.get("val_loss", math.inf)),
+                train_loss=history.history['loss'][-1], epochs=epochs_run,
+                stopped_early=epochs_run < end_epoch, seconds=trial.get("seconds", 0) + time.perf_counter() - started)
+
+
+# Function to search LSTM hyperparameters on a process pool with successive halving
+def run_lstm_sweep(file_path, grid=None, last_n_years=None, min_epochs=2, max_epochs=20, eta=3, patience=3,
+                   batch_size=32, workers=None, threads_per_worker=None, folder=None, on_rung=None):
+    """
+    Try every combination in grid (n_steps, units, dropout) on one city's dataset.
+    - Rung budgets are min_epochs, min_epochs*eta, ... up to max_epochs; after each rung only the best 1/eta
+      of the trials (by validation loss) keep training, resumed from their checkpoints.
+    - Early stopping (patience epochs) inside each rung; a trial that stops early keeps its score but is not
+      trained further.
+    - Trials run on `workers` processes, each with its TensorFlow thread pools pinned to threads_per_worker
+      (default: the cores split evenly between workers).
+    Writes the leaderboard to folder/leaderboard.csv (default Assets/LSTM/Sweeps/<city>/), keeps the best
+    trial's model as trial_<n>.keras there and returns the leaderboard sorted by validation loss.
+    """
+    grid = grid or SWEEP_GRID
+    workers = workers or max(1, min(os.cpu_count() or 1, 4))
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    folder = folder or os.path.join(SWEEP_DIR, os.path.basename(file_path).split('_')[0])
+    os.makedirs(folder, exist_ok=True)
+
+    names = list(grid)
+    trials = [dict(zip(names, values), trial=i) for i, values in enumerate(itertools.product(*grid.values()))]
+    finished, rung, start_epoch = [], 0, 0
+    budget = min(min_epochs, max_epochs)
+
+    # Spawned workers start with a fresh TensorFlow runtime, so the thread settings take effect
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(threads_per_worker, min(2, threads_per_worker))) as pool:
+        while trials:
+            futures = [pool.submit(_run_trial, trial, file_path, last_n_years, start_epoch, budget, patience,
+                                   batch_size, folder) for trial in trials]
+            results = [dict(future.result(), rung=rung) for future in futures]
+            if on_rung is not None:
+                on_rung(rung, budget, results)
+
+            # Early-stopped trials are done; the rest compete for the next rung
+            finished += [result for result in results if result["stopped_early"] or budget >= max_epochs]
+            running = sorted((result for result in results if not result["stopped_early"]),
+                             key=lambda result: result["val_loss"])
+            if budget >= max_epochs:
+                break
+            keep = max(1, len(running) // eta) if running else 0
+            finished += running[keep:]
+            trials = running[:keep]
+            rung, start_epoch, budget = rung + 1, budget, min(budget * eta, max_epochs)
+
+    leaderboard = pd.DataFrame(finished).sort_values("val_loss").reset_index(drop=True)
+    leaderboard = leaderboard[names + ["val_loss", "train_loss", "epochs", "rung", "stopped_early", "seconds", "trial"]]
+    leaderboard.to_csv(os.path.join(folder, "leaderboard.csv"), index=False)
+
+    # Keep only the winner's checkpoint
+    best_checkpoint = f"trial_{leaderboard['trial'][0]}.keras"
+    for f in os.listdir(folder):
+        if f.startswith("trial_") and f.endswith(".keras") and f != best_checkpoint:
+            os.remove(os.path.join(folder, f))
+    return leaderboard
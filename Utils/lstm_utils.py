@@ -1,53 +1,330 @@
 from sklearn.preprocessing import MinMaxScaler
-from sklearn.model_selection import train_test_split
 import tensorflow as tf
 from tensorflow.keras.callbacks import EarlyStopping
 import numpy as np
+import pandas as pd
+import os
+import time
+from dataclasses import dataclass
 from sklearn.metrics import mean_squared_error,mean_absolute_error,r2_score
+from Utils.constants import rename_mapping
+from Utils.data_utils import clean_data
+from Utils.storage_utils import list_city_datasets, load_dataset
+
+
+# Function to build sliding windows over a (time, features) array without copying
+def sliding_windows(data, n_steps, horizons=1, stride=1, dilation=1):
+    """
+    Return (X, y) where X is a read-only strided view of shape (windows, n_steps, features).
+    - Window i covers rows i*stride, i*stride + dilation, ... (n_steps rows, `dilation` apart).
+    - horizons=h gives y of shape (windows, features), the row h steps after each window (a view as well);
+      a list of horizons gives y of shape (windows, len(horizons), features).
+    """
+    data = np.asarray(data)
+    multi_horizon = not np.isscalar(horizons)
+    horizon_list = list(horizons) if multi_horizon else [horizons]
+    span = (n_steps - 1) * dilation + 1
+    n_windows = (len(data) - span - max(horizon_list)) // stride + 1
+    if n_windows <= 0:
+        raise ValueError(f"Need more than {span + max(horizon_list) - 1} rows to build windows, got {len(data)}.")
+
+    row_stride, feature_stride = data.strides
+    X = np.lib.stride_tricks.as_strided(data, shape=(n_windows, n_steps, data.shape[1]),
+                                        strides=(stride * row_stride, dilation * row_stride, feature_stride),
+                                        writeable=False)
+
+    # Target h steps after the last row of every window
+    targets = [data[span - 1 + h: span - 1 + h + (n_windows - 1) * stride + 1: stride] for h in horizon_list]
+    y = np.stack(targets, axis=1) if multi_horizon else targets[0]
+    return X, y
 
 
 # Function to prepare LSTM data
 def prepare_lstm_data(data, n_steps):
-    X, y = [], []
-    for i in range(len(data) - n_steps):
-        X.append(data[i:i + n_steps])
-        y.append(data[i + n_steps])
-    return np.array(X), np.array(y)
+    return sliding_windows(data, n_steps)
 
 
-# Function to train LSTM model and generate predictions
-def train_lstm_model(data, future_days=7, n_steps=30):
+# Training settings that trade speed against accuracy on a given machine
+@dataclass
+class LSTMTrainingConfig:
+    epochs: int = 20
+    batch_size: int = 32
+    patience: int = 5  # early stopping patience in epochs
+    units: int = 50
+    dropout: float = 0.2
+    # "relu" is the original cell activation; Keras only uses the fused cuDNN LSTM kernel (GPU) with "tanh"
+    activation: str = "relu"
+    jit_compile: object = "auto"  # True/False to force XLA compilation of the train step on or off
+    intra_op_threads: int = 0  # 0 = TensorFlow's default (all cores); only applies before TensorFlow starts
+    inter_op_threads: int = 0
+    profile: bool = False  # print samples/sec, step time and peak memory after every epoch
+
+
+# Function to apply the thread settings of a training config
+def apply_thread_config(config):
+    """TensorFlow fixes its thread pools when it runs its first op, so call this first in a fresh process."""
+    try:
+        if config.intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(config.intra_op_threads)
+        if config.inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(config.inter_op_threads)
+    except RuntimeError as e:
+        print(f"Thread settings not applied: {e}")
+
+
+def _peak_memory_mb():
+    """Peak resident memory of this process in MB, or None where the resource module is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+# Callback recording throughput, step time and peak memory of every epoch
+class TrainingProfiler(tf.keras.callbacks.Callback):
+    def __init__(self, n_samples, verbose=True):
+        super().__init__()
+        self.n_samples = n_samples
+        self.verbose = verbose
+        self.epochs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.steps, self.started, self.train_seconds = 0, time.perf_counter(), None
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.steps += 1
+
+    def on_test_begin(self, logs=None):
+        # Validation runs inside the epoch; keep it out of the training throughput
+        if self.train_seconds is None:
+            self.train_seconds = time.perf_counter() - self.started
+
+    def on_epoch_end(self, epoch, logs=None):
+        train_seconds = self.train_seconds or time.perf_counter() - self.started
+        record = {
+            "epoch": epoch + 1,
+            "samples_per_sec": self.n_samples / train_seconds,
+            "step_ms": 1000 * train_seconds / max(self.steps, 1),
+            "epoch_seconds": time.perf_counter() - self.started,
+            "peak_memory_mb": _peak_memory_mb(),
+            "loss": (logs or {}).get("loss"),
+            "val_loss": (logs or {}).get("val_loss"),
+        }
+        self.epochs.append(record)
+        if self.verbose:
+            memory = f"{record['peak_memory_mb']:.0f} MB" if record["peak_memory_mb"] is not None else "n/a"
+            print(f"Epoch {record['epoch']}: {record['samples_per_sec']:.0f} samples/s, "
+                  f"{record['step_ms']:.1f} ms/step, peak memory {memory}")
+
+
+# Function to build the LSTM network
+def build_lstm_model(n_steps, n_features, n_cities=0, embedding_dim=4, units=50, dropout=0.2, activation='relu',
+                     jit_compile="auto"):
+    """With n_cities > 0 the model also takes a city index, whose learned embedding is fed at every step."""
+    if not n_cities:
+        model = tf.keras.Sequential([
+            tf.keras.layers.Input(shape=(n_steps, n_features)),
+            tf.keras.layers.LSTM(units, activation=activation),
+            tf.keras.layers.Dropout(dropout),
+            tf.keras.layers.Dense(n_features)
+        ])
+        model.compile(optimizer='adam', loss='mse', jit_compile=jit_compile)
+        return model
+
+    windows = tf.keras.layers.Input(shape=(n_steps, n_features))
+    city_ids = tf.keras.layers.Input(shape=(), dtype='int32')
+    embedding = tf.keras.layers.Embedding(n_cities, embedding_dim)(city_ids)
+    inputs = tf.keras.layers.Concatenate()([windows, tf.keras.layers.RepeatVector(n_steps)(embedding)])
+    hidden = tf.keras.layers.LSTM(units, activation=activation)(inputs)
+    hidden = tf.keras.layers.Dropout(dropout)(hidden)
+    model = tf.keras.Model([windows, city_ids], tf.keras.layers.Dense(n_features)(hidden))
+    model.compile(optimizer='adam', loss='mse', jit_compile=jit_compile)
+    return model
+
+
+# Function to compile an autoregressive multi-step forecast of a model into a single graph
+def make_lstm_forecaster(model):
+    """
+    Return forecaster(windows, future_days, city_ids=None) -> scaled forecasts of shape (batch, future_days,
+    features). windows has shape (batch, n_steps, features); each step's prediction is appended to the window
+    and the oldest row dropped, as a graph loop with no per-step predict() setup. city_ids is only used by
+    models built with n_cities. The first call traces the graph.
+    """
+    with_city_ids = len(model.inputs) > 1
+
+    @tf.function(input_signature=[tf.TensorSpec([None, None, None], tf.float32), tf.TensorSpec([], tf.int32),
+                                  tf.TensorSpec([None], tf.int32)])
+    def forecaster(windows, future_days, city_ids):
+        predictions = tf.TensorArray(tf.float32, size=future_days)
+        for step in tf.range(future_days):
+            prediction = model([windows, city_ids] if with_city_ids else windows, training=False)
+            predictions = predictions.write(step, prediction)
+            windows = tf.concat([windows[:, 1:], prediction[:, tf.newaxis]], axis=1)
+        return tf.transpose(predictions.stack(), [1, 0, 2])
+
+    def forecast(windows, future_days, city_ids=None):
+        city_ids = np.zeros(len(windows), dtype=np.int32) if city_ids is None else city_ids
+        return forecaster(tf.convert_to_tensor(windows, tf.float32), tf.constant(future_days, tf.int32),
+                          tf.convert_to_tensor(city_ids, tf.int32))
+
+    return forecast
+
+
+# Function to load one city's cleaned features scaled with the city's own MinMaxScaler
+def scale_city_series(file_path, features):
+    """Returns the fitted scaler, the scaled (time, features) float32 array and its dates."""
+    data = clean_data(load_dataset(file_path).set_index("date")[features])
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    return scaler, scaler.fit_transform(data.values).astype(np.float32, copy=False), data.index
+
+
+# Function to load one city's series, scaled per city, and keep the train or test part
+def load_scaled_city_series(file_path, features, n_steps, split="train", test_size=0.2):
+    """
+    Return the rows of the city's scaled series (see scale_city_series) needed for its train or test windows
+    (the last test_size of windows, chronologically, are the test windows, as in split_windows).
+    """
+    _, scaled_data, _ = scale_city_series(file_path, features)
+    n_windows = len(scaled_data) - n_steps
+    split_row = n_steps + n_windows - int(np.ceil(test_size * n_windows))
+    return scaled_data[:split_row] if split == "train" else scaled_data[split_row - n_steps:]
+
+
+# Function to stream (window, target) batches from many cities' stored series
+def city_window_dataset(file_paths, features, n_steps=30, split="train", batch_size=32, shuffle_buffer=10000,
+                        cycle_length=4, seed=None, city_ids=False):
+    """
+    tf.data pipeline that generates LSTM windows on the fly instead of materialising X/y:
+    - cities are loaded lazily, cycle_length at a time, and their windows interleaved;
+    - windows are cut from each city's series by a parallel map and mixed in a bounded shuffle buffer;
+    - batches are prefetched while the model trains.
+    city_ids=True yields ((window, city index), target), the index being the city's position in file_paths,
+    for models built with n_cities.
+    Memory is bounded by cycle_length series plus the shuffle buffer, whatever the number of cities or years.
+    """
+    n_features = len(features)
+
+    def load_series(file_path):
+        series = tf.numpy_function(
+            lambda path: load_scaled_city_series(path.decode(), features, n_steps, split),
+            [file_path], tf.float32)
+        series.set_shape([None, n_features])
+        return series
+
+    def city_windows(file_path, city_id):
+        series = load_series(file_path)
+        n_windows = tf.cast(tf.shape(series)[0] - n_steps, tf.int64)
+
+        def window(i):
+            X = series[i:i + n_steps]
+            return ((X, city_id) if city_ids else X), series[i + n_steps]
+
+        return tf.data.Dataset.range(tf.maximum(n_windows, 0)).map(window, num_parallel_calls=tf.data.AUTOTUNE)
+
+    dataset = tf.data.Dataset.from_tensor_slices((list(file_paths), tf.range(len(file_paths), dtype=tf.int32)))
+    if split == "train":
+        dataset = dataset.shuffle(len(file_paths), seed=seed)
+    dataset = dataset.interleave(city_windows, cycle_length=cycle_length, num_parallel_calls=tf.data.AUTOTUNE,
+                                 deterministic=split != "train")
+    if split == "train":
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def _city_files(folder, cities):
+    city_files = {city: os.path.join(folder, f) for city, f in list_city_datasets(folder).items()
+                  if cities is None or city in cities}
+    if not city_files:
+        raise ValueError(f"No datasets found in {folder}.")
+    return city_files
+
+
+# Function to train one LSTM on many cities with the streaming pipeline
+def train_lstm_model_streaming(folder="Datasets", cities=None, n_steps=30, epochs=20, batch_size=32,
+                               shuffle_buffer=10000, cycle_length=4, city_embedding=False):
+    """
+    Train on every stored city in folder (or only `cities`) without loading all windows into memory.
+    city_embedding=True adds a learned per-city embedding; city indices follow list_city_datasets order.
+    Returns the trained model, the final train loss and the final test loss.
+    """
+    features = list(rename_mapping.keys())
+    file_paths = list(_city_files(folder, cities).values())
+
+    train_dataset = city_window_dataset(file_paths, features, n_steps, "train", batch_size, shuffle_buffer,
+                                        cycle_length, city_ids=city_embedding)
+    test_dataset = city_window_dataset(file_paths, features, n_steps, "test", batch_size, shuffle_buffer,
+                                       cycle_length, city_ids=city_embedding)
+
+    model = build_lstm_model(n_steps, len(features), len(file_paths) if city_embedding else 0)
+    early_stop = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
+    history = model.fit(train_dataset, epochs=epochs, verbose=1, validation_data=test_dataset, callbacks=[early_stop])
+    return model, history.history['loss'][-1], history.history.get('val_loss', [None])[-1]
+
+
+# Function to split windows chronologically into train and test sets (slices, so they stay views)
+def split_windows(X, y, test_size=0.2):
+    # Same sizes as train_test_split(test_size=0.2, shuffle=False)
+    n_test = int(np.ceil(test_size * len(X)))
+    return X[:-n_test], X[-n_test:], y[:-n_test], y[-n_test:]
+
+
+# Function to evaluate a model on test windows in the original units
+def evaluate_lstm_model(model, scaler, X_test, y_test):
+    predictions = model.predict(X_test, verbose=0)
+
+    # Inverse transform test and prediction data
+    y_test_original = scaler.inverse_transform(y_test)
+    predictions_original = scaler.inverse_transform(predictions)
+
+    # Calculate error metrics
+    mse = mean_squared_error(y_test_original, predictions_original)
+    mae = mean_absolute_error(y_test_original, predictions_original)
+    r2 = r2_score(y_test_original, predictions_original)
+
+    print(f"Test MSE: {mse}")
+    print(f"Test MAE: {mae}")
+    print(f"Test R^2: {r2}")
+    return r2
+
+
+# Function to scale data and train a new LSTM model on it
+def fit_lstm_model(data, n_steps=30, config=None, callbacks=None):
+    """
+    Train with the settings in config (an LSTMTrainingConfig, defaults if None); extra Keras callbacks may be
+    passed. Returns the model, the fitted scaler, the final train and test losses and the test R^2.
+    """
+    config = config or LSTMTrainingConfig()
     # Check for missing values in the data
     if np.isnan(data).any():
         raise ValueError("Data contains NaN values. Please clean the data before training the model.")
 
     # Scaling data
+    # Keep float32 end to end (MinMaxScaler preserves it; older inputs may still be float64)
+    data = np.asarray(data, dtype=np.float32)
     scaler = MinMaxScaler(feature_range=(0, 1))
     scaled_data = scaler.fit_transform(data)
 
-    # Prepare data for LSTM
+    # Prepare data for LSTM (zero-copy windows over scaled_data)
     X, y = prepare_lstm_data(scaled_data, n_steps)
-    X = X.reshape((X.shape[0], X.shape[1], data.shape[1]))
-
-    # Train-test split
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+    X_train, X_test, y_train, y_test = split_windows(X, y)
     print(f"Train Samples: {len(X_train)}, Test Samples: {len(X_test)}")  # Debugging
 
     if len(X_train) == 0 or len(X_test) == 0:
         raise ValueError("Train or Test data is empty. Ensure sufficient data for splitting.")
 
     # Build LSTM model
-    model = tf.keras.Sequential([
-        tf.keras.layers.Input(shape=(X.shape[1], X.shape[2])),
-        tf.keras.layers.LSTM(50, activation='relu'),
-        tf.keras.layers.Dropout(0.2),
-        tf.keras.layers.Dense(data.shape[1])
-    ])
-    model.compile(optimizer='adam', loss='mse')
-    early_stop = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
+    apply_thread_config(config)
+    model = build_lstm_model(n_steps, data.shape[1], units=config.units, dropout=config.dropout,
+                             activation=config.activation, jit_compile=config.jit_compile)
+    early_stop = EarlyStopping(monitor='val_loss', patience=config.patience, restore_best_weights=True)
+    callbacks = [early_stop] + list(callbacks or [])
+    if config.profile:
+        callbacks.append(TrainingProfiler(len(X_train)))
 
     # Train the model
-    history = model.fit(X_train, y_train, epochs=20, verbose=1, validation_data=(X_test, y_test), callbacks=[early_stop])
+    history = model.fit(X_train, y_train, epochs=config.epochs, batch_size=config.batch_size, verbose=1,
+                        validation_data=(X_test, y_test), callbacks=callbacks)
     # Remove callabcks and change number of epochs if needed
 
     # Print the train and validation loss
@@ -58,35 +335,61 @@ def train_lstm_model(data, future_days=7, n_steps=30):
         print("Validation loss not computed.")
 
     # Evaluate the model on test data
-    predictions = model.predict(X_test, verbose=0)
-
-    # Inverse transform test and prediction data
-    y_test_original = scaler.inverse_transform(y_test)
-    predictions_original = scaler.inverse_transform(predictions)
-
-    # Calculate error metrics
-    mse = mean_squared_error(y_test_original, predictions_original)
-    mae = mean_absolute_error(y_test_original, predictions_original)
-    r2 = r2_score(y_test_original, predictions_original)
+    r2 = evaluate_lstm_model(model, scaler, X_test, y_test)
+    return model, scaler, history.history['loss'][-1], history.history.get('val_loss', [None])[-1], r2
 
-    # Percentage accuracy
-    percentage_accuracy = 100 - (np.mean(np.abs(y_test_original - predictions_original) / y_test_original) * 100)
 
-    print(f"Test MSE: {mse}")
-    print(f"Test MAE: {mae}")
-    print(f"Test R^2: {r2}")
+# Function to forecast future days after the end of a series with a trained model
+def forecast_lstm_model(model, scaler, data, future_days=7, n_steps=30, forecaster=None):
+    """Pass a forecaster from make_lstm_forecaster(model) to reuse its traced graph across calls."""
+    forecaster = forecaster or make_lstm_forecaster(model)
+    scaled_window = scaler.transform(np.asarray(data[-n_steps:], dtype=np.float32))
 
-    # Predict future values
-    input_seq = scaled_data[-n_steps:]
-    forecast = []
-    for _ in range(future_days):
-        input_reshaped = input_seq.reshape((1, n_steps, data.shape[1]))
-        prediction = model.predict(input_reshaped, verbose=0)
-        print(f"Prediction Step {_ + 1}: {prediction}")  # Debugging
-        forecast.append(prediction[0])
-        input_seq = np.vstack((input_seq[1:], prediction))
+    # Predict future values in one compiled autoregressive call
+    forecast = forecaster(scaled_window[np.newaxis], future_days).numpy()[0]
 
     # Inverse transform the forecast
     forecast = scaler.inverse_transform(forecast)
-    print("Final Forecast:", forecast)  # Debugging
-    return history.history['loss'][-1], history.history.get('val_loss', [None])[-1], forecast, round(r2 * 100)
+    return forecast
+
+
+# Function to train one LSTM across many stored cities and forecast them all in one batch
+def train_global_lstm_model(folder="Datasets", cities=None, future_days=7, n_steps=30, city_embedding=False,
+                            epochs=20, batch_size=32, shuffle_buffer=10000, cycle_length=4):
+    """
+    Trains with train_lstm_model_streaming, then loads the cities one at a time to score their test windows
+    and collect their last n_steps rows. Returns the model, the final train and test losses, {city: test R^2}
+    and {city: forecast DataFrame} computed by a single batched forecaster call, indexed by the days after each
+    city's last date with the display feature names (as the LSTM page saves them).
+    """
+    model, train_loss, test_loss = train_lstm_model_streaming(folder, cities, n_steps, epochs, batch_size,
+                                                              shuffle_buffer, cycle_length, city_embedding)
+    features = list(rename_mapping.keys())
+    scalers, windows, r2_scores, last_dates = {}, [], {}, {}
+    for city_id, (city, file_path) in enumerate(_city_files(folder, cities).items()):
+        scalers[city], scaled_data, dates = scale_city_series(file_path, features)
+        last_dates[city] = pd.to_datetime(dates[-1])
+        X, y = prepare_lstm_data(scaled_data, n_steps)
+        _, X_test, _, y_test = split_windows(X, y)
+        predictions = model.predict([X_test, np.full(len(X_test), city_id, np.int32)] if city_embedding else X_test,
+                                    verbose=0)
+        r2_scores[city] = r2_score(scalers[city].inverse_transform(y_test), scalers[city].inverse_transform(predictions))
+        windows.append(scaled_data[-n_steps:])
+
+    # Forecast every city at once
+    scaled_forecasts = make_lstm_forecaster(model)(np.stack(windows), future_days,
+                                                   np.arange(len(windows), dtype=np.int32))
+    forecasts = {}
+    for city_id, city in enumerate(scalers):
+        future_dates = pd.date_range(start=last_dates[city] + pd.Timedelta(days=1), periods=future_days)
+        forecasts[city] = pd.DataFrame(scalers[city].inverse_transform(scaled_forecasts[city_id].numpy()),
+                                       columns=features, index=future_dates).rename(columns=rename_mapping)
+    return model, train_loss, test_loss, r2_scores, forecasts
+
+
+# Function to train LSTM model and generate predictions
+def train_lstm_model(data, future_days=7, n_steps=30, config=None):
+    """config is an LSTMTrainingConfig (defaults if None)."""
+    model, scaler, train_loss, test_loss, r2 = fit_lstm_model(data, n_steps, config)
+    forecast = forecast_lstm_model(model, scaler, data, future_days, n_steps)
+    return train_loss, test_loss, forecast, round(r2 * 100)
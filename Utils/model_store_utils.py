@@ -0,0 +1,109 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from Utils.cache_utils import appended_rows, row_hashes
+
+# Fitted parameters, one file per city and feature
+MODEL_DIRS = {"arima": os.path.join("Assets", "ARIMA", "Models"), "sarima": os.path.join("Assets", "SARIMA", "Models")}
+# Re-estimate once this many new days have been filtered with old parameters
+REFIT_AFTER_DAYS = 30
+# Re-estimate when the mean squared standardized one-step error of the days filtered since the last fit is this
+# many times its in-sample level (about twice the usual error size), checked once DRIFT_MIN_DAYS have been seen
+DRIFT_RATIO = 4.0
+DRIFT_MIN_DAYS = 7
+
+
+def _model_path(city_name, feature, model):
+    return os.path.join(MODEL_DIRS[model], city_name, f"{feature}.pkl")
+
+
+def _build_model(series, model, order, seasonal_order, exog=None, trend=None):
+    if model == "arima":
+        return sm.tsa.ARIMA(series, order=order)
+    return sm.tsa.statespace.SARIMAX(series, exog=exog, order=order, seasonal_order=seasonal_order, trend=trend)
+
+
+def _save_entry(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(entry, f)
+    os.replace(path + ".tmp", path)
+
+
+# Function to load a stored fit, or None
+def load_fitted_entry(city_name, feature, model):
+    path = _model_path(city_name, feature, model)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _spec(model, order, seasonal_order, exog, trend):
+    return {"model": model, "order": tuple(order), "seasonal_order": tuple(seasonal_order),
+            "exog_columns": list(exog.columns) if exog is not None else None, "trend": trend}
+
+
+def _update_reason(entry, series, spec):
+    """
+    (reason, new_rows): why the stored parameters can't simply be filtered over series (None if they can) and
+    how many days series has after the stored fit. series may start later than the stored fit (a moving history
+    window) as long as the dates they share are unchanged.
+    """
+    if entry is None:
+        return "fitted", 0
+    if any(entry.get(name) != value for name, value in spec.items()):
+        return "refit (orders changed)", 0
+    new_rows = appended_rows(series, entry.get("row_hashes"), entry["last_date"])
+    if new_rows is None:
+        return "refit (history changed)", 0
+    if entry["filtered_days"] + new_rows > REFIT_AFTER_DAYS:
+        return "refit (schedule)", new_rows
+    return None, new_rows
+
+
+# Function to get fitted state-space results for a feature, re-estimating parameters only when needed
+def fitted_results(series, city_name, feature, model="arima", order=(1, 1, 1), seasonal_order=(0, 0, 0, 0),
+                   exog=None, trend=None):
+    """
+    series is the series the model is fitted on; SARIMA models may also take exog regressors and a trend.
+    The estimated parameters are stored per city and feature; when only new days arrived (the start may move
+    forward too, as with a "years of history" window) they are run through the Kalman filter with those
+    parameters fixed (what results.append(new, refit=False) does) instead of a new maximum-likelihood fit.
+    Parameters are re-estimated when the orders or the days already fitted change, after REFIT_AFTER_DAYS
+    filtered days, or when the filtered days' standardized one-step errors show drift.
+    Returns (results, status).
+    """
+    path = _model_path(city_name, feature, model)
+    entry = load_fitted_entry(city_name, feature, model)
+    spec = _spec(model, order, seasonal_order, exog, trend)
+    status, new_rows = _update_reason(entry, series, spec)
+
+    if status is None:
+        model_spec = _build_model(series, model, order, seasonal_order, exog, trend)
+        results = model_spec.filter(np.asarray(entry["params"]))
+        status = "updated" if new_rows else "reused"
+        if new_rows:
+            errors = results.standardized_forecasts_error[0, -new_rows:]
+            entry["drift_sum"] += float(np.nansum(errors ** 2))
+            filtered_days = entry["filtered_days"] + new_rows
+            if filtered_days >= DRIFT_MIN_DAYS and entry["drift_sum"] / filtered_days > DRIFT_RATIO * entry["baseline"]:
+                status = "refit (drift)"
+
+    if status not in ("updated", "reused"):
+        fit_kwargs = {} if model == "arima" else {"disp": False}
+        results = _build_model(series, model, order, seasonal_order, exog, trend).fit(**fit_kwargs)
+        # In-sample level of the squared standardized one-step errors (skipping the diffuse start)
+        in_sample = results.standardized_forecasts_error[0, results.loglikelihood_burn:]
+        entry = dict(spec, params=np.asarray(results.params).tolist(), param_names=list(results.param_names),
+                     filtered_days=0, drift_sum=0.0,
+                     baseline=float(np.nanmean(in_sample ** 2)), fitted_at=pd.Timestamp.now().isoformat())
+    elif new_rows:
+        entry["filtered_days"] += new_rows
+
+    if status != "reused":
+        entry.update(first_date=series.index[0], last_date=series.index[-1], row_hashes=row_hashes(series))
+        _save_entry(path, entry)
+    return results, status
@@ -0,0 +1,166 @@
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+import numpy as np
+import statsmodels.api as sm
+from Utils.cache_utils import dataset_fingerprint
+from Utils.parallel_utils import run_fits
+from Utils.arima_utils import check_stationarity
+from Utils.resample_utils import RESOLUTIONS, aggregate_series
+from Utils.sarima_utils import fourier_terms, make_stationary
+
+# Chosen orders, one JSON file per city and model: {feature, "feature (Weekly)" or "feature (Fourier 3)": {...}}
+ORDER_DIRS = {"arima": os.path.join("Assets", "ARIMA", "Orders"), "sarima": os.path.join("Assets", "SARIMA", "Orders")}
+# Search space and limits used when none are given. d and D are not searched (likelihoods of differently
+# differenced series can't be compared): d is the fewest differences, up to "d", that pass the ADF test and D is fixed
+MAX_ORDERS = {"p": 2, "d": 1, "q": 2, "P": 1, "D": 0, "Q": 1}
+FIT_MAXITER = 50
+FIT_TIME_LIMIT = 30.0  # seconds per candidate fit
+
+
+class _FitTimeLimit(Exception):
+    pass
+
+
+# Function to choose the differencing order with the ADF unit-root test
+def choose_differencing(series, max_d=MAX_ORDERS["d"]):
+    series = series.dropna()
+    d = 0
+    while d < max_d and check_stationarity(series)["p-value"] >= 0.05:
+        series = series.diff().dropna()
+        d += 1
+    return d
+
+
+# Function to list candidate orders with d fixed: [((p, d, q), (P, D, Q, m))], seasonal part (0, 0, 0, 0) for ARIMA
+def candidate_orders(model="arima", max_orders=None, m=7, d=0):
+    limits = dict(MAX_ORDERS, **(max_orders or {}))
+    orders = [(p, d, q) for p, q in itertools.product(range(limits["p"] + 1), range(limits["q"] + 1))]
+    if model == "arima":
+        return [(order, (0, 0, 0, 0)) for order in orders]
+    seasonal = [(P, limits["D"], Q, m) for P, Q in itertools.product(range(limits["P"] + 1), range(limits["Q"] + 1))]
+    return [(order, seasonal_order) for order in orders for seasonal_order in seasonal]
+
+
+# Function to get the series a forecast actually fits for a feature
+def model_series(series, feature, model="arima", resolution="D", harmonics=0):
+    """
+    Weekly/monthly aggregates for those resolutions; SARIMA also fits the ADF-differenced series (make_stationary),
+    except in Fourier mode (harmonics > 0), which fits the series itself.
+    """
+    series = series.dropna()
+    if resolution != "D":
+        series = aggregate_series(series, feature, resolution)
+    return series if model == "arima" or harmonics else make_stationary(series)
+
+
+# Function to fit one candidate order and score it, giving up after maxiter iterations or time_limit seconds
+def score_order(series, model, order, seasonal_order, maxiter=FIT_MAXITER, time_limit=FIT_TIME_LIMIT, harmonics=0):
+    """
+    series is the one the forecast fits (see model_series). harmonics > 0 scores the SARIMA Fourier mode:
+    annual Fourier regressors plus a constant when d = 0, as fit_sarima_feature fits it.
+    """
+    started = time.perf_counter()
+
+    def check_time(params):
+        if time.perf_counter() - started > time_limit:
+            raise _FitTimeLimit()
+
+    result = {"order": list(order), "seasonal_order": list(seasonal_order), "aic": np.inf, "bic": np.inf,
+              "converged": False, "status": "ok"}
+    try:
+        if model == "arima":
+            fitted = sm.tsa.ARIMA(series, order=order).fit(
+                method_kwargs={"maxiter": maxiter, "callback": check_time})
+        elif harmonics:
+            fitted = sm.tsa.statespace.SARIMAX(series, exog=fourier_terms(series.index, harmonics), order=order,
+                                               trend="c" if order[1] == 0 else "n").fit(disp=False, maxiter=maxiter,
+                                                                                        callback=check_time)
+        else:
+            fitted = sm.tsa.statespace.SARIMAX(series, order=order,
+                                               seasonal_order=seasonal_order).fit(disp=False, maxiter=maxiter,
+                                                                                  callback=check_time)
+        result.update(aic=float(fitted.aic), bic=float(fitted.bic),
+                      converged=bool(fitted.mle_retvals.get("converged", True)))
+        if not result["converged"]:
+            result["status"] = "iteration limit"
+    except _FitTimeLimit:
+        result["status"] = "time limit"
+    except Exception as e:
+        result["status"] = f"error: {e}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def _rank(results, criterion):
+    # Converged fits first, then by the information criterion
+    return sorted(results, key=lambda result: (not result["converged"], result[criterion]))
+
+
+# Function to search the best order for every feature, all candidate fits running in parallel
+def search_orders(data, model="arima", max_orders=None, m=7, criterion="aic", maxiter=FIT_MAXITER,
+                  time_limit=FIT_TIME_LIMIT, workers=None, resolution="D", harmonics=0):
+    """
+    Each feature is searched on the series the forecast fits at that resolution (see model_series), with d
+    chosen first by choose_differencing. In the SARIMA Fourier mode (harmonics > 0) only p and q are searched.
+    Returns {feature: candidates ranked best first by criterion ("aic" or
+    "bic"), converged fits first}.
+    """
+    limits = dict(MAX_ORDERS, **(max_orders or {}))
+    series = {feature: model_series(data[feature], feature, model, resolution, harmonics) for feature in data.columns}
+    tasks = [(feature, order, seasonal_order) for feature in data.columns
+             for order, seasonal_order in candidate_orders("arima" if harmonics else model, max_orders, m,
+                                                           choose_differencing(series[feature], limits["d"]))]
+    results = run_fits(score_order, [(series[feature], model, order, seasonal_order, maxiter, time_limit, harmonics)
+                                     for feature, order, seasonal_order in tasks], workers)
+
+    ranked = {}
+    for feature in data.columns:
+        ranked[feature] = _rank([result for (task_feature, _, _), result in zip(tasks, results)
+                                 if task_feature == feature], criterion)
+    return ranked
+
+
+def _orders_path(city_name, model):
+    return os.path.join(ORDER_DIRS[model], f"{city_name}.json")
+
+
+# Function to get the best order per feature, searching only features whose data changed since the last search
+def auto_orders(data, city_name, model="arima", max_orders=None, m=7, criterion="aic", maxiter=FIT_MAXITER,
+                time_limit=FIT_TIME_LIMIT, workers=None, resolution="D", harmonics=0):
+    """
+    Chosen orders are remembered per (city, feature, data fingerprint, search settings, resolution and Fourier
+    harmonics) in
+    Assets/<ARIMA|SARIMA>/Orders/<city>.json. Returns {feature: {"order", "seasonal_order", "aic", "bic", ...}}.
+    """
+    settings = {"max_orders": dict(MAX_ORDERS, **(max_orders or {})), "m": m, "criterion": criterion,
+                "resolution": resolution, "harmonics": harmonics}
+    path = _orders_path(city_name, model)
+    stored = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            stored = json.load(f)
+
+    suffixes = [RESOLUTIONS[resolution]] if resolution != "D" else []
+    if harmonics:
+        suffixes.append(f"Fourier {harmonics}")
+    keys = {feature: f"{feature} ({', '.join(suffixes)})" if suffixes else feature for feature in data.columns}
+    fingerprints = {feature: dataset_fingerprint(data[feature]) for feature in data.columns}
+    stale = [feature for feature in data.columns
+             if stored.get(keys[feature], {}).get("fingerprint") != fingerprints[feature]
+             or stored[keys[feature]].get("settings") != settings]
+    if stale:
+        ranked = search_orders(data[stale], model, max_orders, m, criterion, maxiter, time_limit, workers, resolution,
+                               harmonics)
+        for feature, candidates in ranked.items():
+            stored[keys[feature]] = dict(candidates[0], fingerprint=fingerprints[feature], settings=settings,
+                                         candidates=len(candidates),
+                                         searched_at=datetime.now().isoformat(timespec="seconds"))
+
+        os.makedirs(ORDER_DIRS[model], exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(stored, f, indent=2)
+        os.replace(path + ".tmp", path)
+    return {feature: stored[keys[feature]] for feature in data.columns}
@@ -0,0 +1,32 @@
+import importlib
+import sys
+import time
+
+# Libraries worth reporting when a page pulls them in
+HEAVY_LIBRARIES = ["tensorflow", "keras", "statsmodels", "sklearn", "seaborn", "matplotlib", "geopy", "pandas",
+                   "pyarrow", "openmeteo_requests", "requests_cache"]
+
+# page module -> (seconds spent importing it, heavy libraries it loaded); kept for the life of the server process
+page_import_timings = {}
+
+
+# Function to import a page's module on first use and return its page function
+def load_page(module_name, function_name):
+    """Later calls (and Streamlit reruns) reuse the imported module, so only the first visit pays for imports."""
+    if module_name not in sys.modules:
+        loaded_before = set(sys.modules)
+        start = time.perf_counter()
+        importlib.import_module(module_name)
+        seconds = time.perf_counter() - start
+        libraries = [name for name in HEAVY_LIBRARIES if name in sys.modules and name not in loaded_before]
+        page_import_timings[module_name] = (seconds, libraries)
+        print(f"Imported {module_name} in {seconds:.2f}s" + (f" (loaded {', '.join(libraries)})" if libraries else ""))
+    return getattr(sys.modules[module_name], function_name)
+
+
+# Function to describe a page's import cost for display
+def page_import_summary(module_name):
+    if module_name not in page_import_timings:
+        return None
+    seconds, libraries = page_import_timings[module_name]
+    return f"Page loaded in {seconds:.2f}s" + (f", importing {', '.join(libraries)}" if libraries else "")
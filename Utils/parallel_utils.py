@@ -0,0 +1,65 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from threadpoolctl import threadpool_limits
+
+# Upper bound on model-fitting worker processes (overridable through the environment)
+MAX_FIT_WORKERS = int(os.environ.get("MAX_FIT_WORKERS", os.cpu_count() or 1))
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _init_fit_worker():
+    """One BLAS thread per worker: the pool already uses every core, so nested threading only oversubscribes."""
+    # The variables only reach BLAS libraries loaded after this point; threadpoolctl caps those already loaded
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[name] = "1"
+    threadpool_limits(1)
+
+
+# Function to get the shared process pool for model fits, starting it on first use
+def get_fit_pool(workers=MAX_FIT_WORKERS):
+    """Workers are spawned (not forked) so the pool is safe to use from Streamlit's threads."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=_init_fit_worker)
+            _pool_workers = workers
+    return _pool
+
+
+def _discard_pool(pool):
+    """Drop a broken pool so the next get_fit_pool starts a fresh one (unless another thread already did)."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+# Function to run independent fits, in parallel when there is more than one task and worker
+def run_fits(func, tasks, workers=None):
+    """
+    Call func(*args) for every args tuple in tasks and return the results in task order.
+    workers=None uses up to MAX_FIT_WORKERS processes; workers=1 runs in this process.
+    If a worker dies (e.g. killed for memory) the pool is replaced and the tasks are run once more.
+    """
+    tasks = list(tasks)
+    workers = min(workers or MAX_FIT_WORKERS, MAX_FIT_WORKERS, len(tasks))
+    if workers <= 1:
+        return [func(*args) for args in tasks]
+    for attempt in range(2):
+        pool = get_fit_pool(workers)
+        try:
+            futures = [pool.submit(func, *args) for args in tasks]
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            if attempt == 1:
+                raise
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import requests
+
+# Upstream services used when recording
+ARCHIVE_UPSTREAM = "https://archive-api.open-meteo.com/v1/archive"
+NOMINATIM_UPSTREAM = "https://nominatim.openstreetmap.org/search"
+
+
+def _split_messages(body):
+    """Split an Open-Meteo FlatBuffer body into its length-prefixed per-location messages."""
+    messages, pos = [], 0
+    while pos < len(body):
+        length = int.from_bytes(body[pos:pos + 4], byteorder="little")
+        messages.append(body[pos:pos + 4 + length])
+        pos += 4 + length
+    return messages
+
+
+def _query_values(query, name):
+    """Values of a parameter sent either repeated (a=1&a=2) or comma-separated (a=1,2)."""
+    return [value for item in query.get(name, []) for value in item.split(",") if value]
+
+
+def _archive_key(latitude, longitude, start_date, end_date):
+    return f"{float(latitude):.4f}_{float(longitude):.4f}_{start_date}_{end_date}"
+
+
+# Recorded responses for the archive and geocoding APIs, stored under one folder
+class ReplayStore:
+    def __init__(self, folder):
+        self.folder = folder
+        self.archive_folder = os.path.join(folder, "archive")
+        self.geocode_file = os.path.join(folder, "geocode.json")
+        os.makedirs(self.archive_folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self.geocodes = {}
+        if os.path.exists(self.geocode_file):
+            with open(self.geocode_file, encoding="utf-8") as f:
+                self.geocodes = json.load(f)
+
+    def archive_path(self, key):
+        return os.path.join(self.archive_folder, f"{key}.fb")
+
+    def save_archive(self, key, message):
+        with open(self.archive_path(key), "wb") as f:
+            f.write(message)
+
+    def load_archive(self, key, start_date, end_date, any_location=False):
+        """Recorded message for a location and date range; optionally any location with the same range."""
+        path = self.archive_path(key)
+        if not os.path.exists(path) and any_location:
+            suffix = f"_{start_date}_{end_date}.fb"
+            candidates = sorted(f for f in os.listdir(self.archive_folder) if f.endswith(suffix))
+            if candidates:
+                # Pick deterministically so the same location always gets the same recording
+                index = int(hashlib.sha1(key.encode()).hexdigest(), 16) % len(candidates)
+                path = os.path.join(self.archive_folder, candidates[index])
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def save_geocode(self, query, results):
+        with self._lock:
+            self.geocodes[" ".join(query.split()).casefold()] = results
+            with open(self.geocode_file, "w", encoding="utf-8") as f:
+                json.dump(self.geocodes, f, indent=2)
+
+    def load_geocode(self, query, any_location=False):
+        results = self.geocodes.get(" ".join(query.split()).casefold())
+        if results is None and any_location:
+            # Stable made-up coordinates so unknown names still resolve during load tests
+            digest = int(hashlib.sha1(query.casefold().encode()).hexdigest(), 16)
+            latitude, longitude = (digest % 12000) / 100 - 60, (digest // 12000 % 36000) / 100 - 180
+            results = [{"lat": str(latitude), "lon": str(longitude), "display_name": query, "importance": 0.5}]
+        return results
+
+
+def _make_handler(store, mode, latency, jitter, error_rate, error_status, any_location, stats):
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _count(self, name):
+            with stats_lock:
+                stats[name] = stats.get(name, 0) + 1
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/__stats":
+                return self._send(200, json.dumps(stats).encode(), "application/json")
+
+            self._count("requests")
+            if latency or jitter:
+                time.sleep(latency + random.uniform(0, jitter))
+            if error_rate and random.random() < error_rate:
+                self._count("injected_errors")
+                return self._send(error_status, b'{"error": true, "reason": "Injected error"}', "application/json")
+
+            if url.path.endswith("/archive"):
+                return self._archive(query)
+            if url.path.endswith("/search"):
+                return self._search(query)
+            self._send(404, b"Not found", "text/plain")
+
+        def _archive(self, query):
+            start_date, end_date = query["start_date"][0], query["end_date"][0]
+            keys = [_archive_key(latitude, longitude, start_date, end_date) for latitude, longitude in
+                    zip(_query_values(query, "latitude"), _query_values(query, "longitude"))]
+
+            if mode == "record":
+                params = {name: ",".join(values) for name, values in query.items()}
+                upstream = requests.get(ARCHIVE_UPSTREAM, params=params, timeout=120)
+                if upstream.status_code == 200:
+                    for key, message in zip(keys, _split_messages(upstream.content)):
+                        store.save_archive(key, message)
+                self._count("recorded")
+                return self._send(upstream.status_code, upstream.content, upstream.headers.get("Content-Type", ""))
+
+            messages = [store.load_archive(key, start_date, end_date, any_location) for key in keys]
+            if any(message is None for message in messages):
+                self._count("replay_misses")
+                return self._send(400, json.dumps({"error": True, "reason": "No recording for this request"}).encode(),
+                                  "application/json")
+            self._count("replayed")
+            self._send(200, b"".join(messages), "application/octet-stream")
+
+        def _search(self, query):
+            q = query.get("q", [""])[0]
+            if mode == "record":
+                upstream = requests.get(NOMINATIM_UPSTREAM, params={k: v[0] for k, v in query.items()},
+                                        headers={"User-Agent": "weather_app"}, timeout=30)
+                if upstream.status_code == 200:
+                    store.save_geocode(q, upstream.json())
+                self._count("recorded")
+                return self._send(upstream.status_code, upstream.content, "application/json")
+
+            results = store.load_geocode(q, any_location)
+            self._count("replayed" if results is not None else "replay_misses")
+            limit = int(query.get("limit", ["10"])[0])
+            self._send(200, json.dumps((results or [])[:limit]).encode(), "application/json")
+
+    stats_lock = threading.Lock()
+    return ReplayHandler
+
+
+# Function to start the stand-in server for the archive and geocoding APIs in a background thread
+def start_replay_server(folder, host="127.0.0.1", port=0, mode="replay", latency=0.0, jitter=0.0,
+                        error_rate=0.0, error_status=500, any_location=False):
+    """
+    Serve /v1/archive (Open-Meteo FlatBuffers) and /search (Nominatim JSON) from recordings in folder.
+    - mode="record" proxies to the real services and saves every answer; mode="replay" works offline.
+    - latency/jitter (seconds) delay each answer; error_rate answers that fraction with error_status.
+    - any_location serves another recording with the same dates (and made-up coordinates for unknown
+      city names) so load tests can use many more cities than were recorded.
+    - GET /__stats returns request, replay, miss and injected error counts.
+    Point the app at it with OPENMETEO_ARCHIVE_URL=http://host:port/v1/archive,
+    NOMINATIM_DOMAIN=host:port and NOMINATIM_SCHEME=http.
+    Returns (server, base url); stop it with server.shutdown().
+    """
+    stats = {}
+    handler = _make_handler(ReplayStore(folder), mode, latency, jitter, error_rate, error_status, any_location,
+                            stats)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, name="replay-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
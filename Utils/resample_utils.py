@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from Utils.constants import inverse_rename_mapping
+
+# Resolutions the statistical models can be fitted at (pandas period codes)
+RESOLUTIONS = {"D": "Daily", "W": "Weekly", "M": "Monthly"}
+# Features aggregated by summing; all others are averaged
+SUM_FEATURES = ["precipitation_sum"]
+
+
+def _is_sum(feature):
+    return inverse_rename_mapping.get(feature, feature) in SUM_FEATURES
+
+
+# Function to get the calendar days of a date index, without timezone
+def naive_days(index):
+    index = pd.DatetimeIndex(index)
+    return (index.tz_localize(None) if index.tz is not None else index).normalize()
+
+
+# Function to aggregate a daily series to weekly or monthly values
+def aggregate_series(series, feature, resolution):
+    """
+    Sum for totals (precipitation), mean otherwise. Periods with missing days (usually the current, partial
+    one) are dropped. The result is indexed by period start dates.
+    """
+    periods = naive_days(series.index).to_period(resolution)
+    grouped = pd.Series(series.values, index=periods).groupby(level=0)
+    values = grouped.sum() if _is_sum(feature) else grouped.mean()
+    complete = grouped.size() == (values.index.end_time.normalize() - values.index.start_time).days + 1
+    values = values[complete]
+    values.index = values.index.to_timestamp()
+    if len(values) > 2 and values.index.inferred_freq:
+        values = values.asfreq(values.index.inferred_freq)
+    return values
+
+
+# Function to count the periods to forecast so the last of future_days is covered
+def forecast_periods(series, aggregated, resolution, future_days):
+    last_period = pd.Period(aggregated.index[-1], resolution)
+    target_period = pd.Period(naive_days(series.index)[-1] + pd.Timedelta(days=future_days), resolution)
+    return target_period.ordinal - last_period.ordinal
+
+
+# Function to get the start dates of the periods after an aggregated series
+def future_period_starts(aggregated, resolution, steps):
+    last_period = pd.Period(aggregated.index[-1], resolution)
+    return pd.PeriodIndex([last_period + i for i in range(1, steps + 1)]).to_timestamp()
+
+
+# Function to get the mean value of a feature on each day of the year
+def climatology(series):
+    days = naive_days(series.index)
+    profile = pd.Series(series.values, index=days.dayofyear).groupby(level=0).mean()
+    return profile.reindex(range(1, 367)).interpolate(limit_direction="both")
+
+
+# Function to spread weekly/monthly forecasts back over days with a climatology profile
+def disaggregate_forecast(forecast, series, aggregated, feature, resolution, future_days):
+    """
+    forecast holds the values of the periods after `aggregated` (the series aggregate_series returned).
+    Averaged features: each day gets its period's forecast plus the day's climatological departure from the
+    period mean. Totals: each day gets its climatological share of the period total.
+    Returns the future_days days after the end of the daily series.
+    """
+    profile = climatology(series)
+    values = np.asarray(forecast, dtype=float)
+    first_period = pd.Period(aggregated.index[-1], resolution) + 1
+    days = pd.date_range(naive_days(series.index)[-1] + pd.Timedelta(days=1), periods=future_days)
+
+    daily = []
+    for day in days:
+        period = pd.Period(day, resolution)
+        period_value = values[period.ordinal - first_period.ordinal]
+        period_profile = profile[pd.date_range(period.start_time, period.end_time.normalize()).dayofyear].values
+        if _is_sum(feature):
+            total = period_profile.sum()
+            daily.append(period_value * (profile[day.dayofyear] / total if total > 0 else 1 / len(period_profile)))
+        else:
+            daily.append(period_value + profile[day.dayofyear] - period_profile.mean())
+
+    index = series.index[-1] + pd.to_timedelta(np.arange(1, future_days + 1), unit="D")
+    return pd.Series(daily, index=index, name=getattr(forecast, "name", None))
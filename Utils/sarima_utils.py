@@ -1,8 +1,18 @@
 from statsmodels.tsa.stattools import adfuller
 import statsmodels.api as sm
 import numpy as np
+import pandas as pd
 from Utils.constants import inverse_rename_mapping
+from Utils.arima_utils import merge_feature_results
+from Utils.model_store_utils import fitted_results
 from Utils.metrics_utils import calculate_metrics, calculate_metrics_precipitation
+from Utils.parallel_utils import run_fits
+from Utils.resample_utils import (RESOLUTIONS, aggregate_series, disaggregate_forecast, forecast_periods,
+                                  future_period_starts)
+
+
+# Length of the annual cycle in days for the Fourier seasonal mode
+ANNUAL_PERIOD = 365.25
 
 
 # Function to check stationarity and make series stationary
@@ -17,68 +27,128 @@ def make_stationary(series):
     return series
 
 
-# SARIMA Forecast Function (Handles Renamed Features)
-def sarima_forecast(data, p, d, q, P, D, Q, m, future_days):
-    """Train SARIMA models and forecast future values."""
-    forecasts = {}
-    summaries = []
-    overall_metrics = {}
+# Function to build annual Fourier terms (sin/cos pairs) for a daily date index
+def fourier_terms(index, harmonics, period=ANNUAL_PERIOD):
+    """Phase is measured from a fixed epoch, so terms for future dates continue the fitted cycle."""
+    index = pd.DatetimeIndex(index)
+    naive_index = index.tz_localize(None) if index.tz is not None else index
+    days = ((naive_index - pd.Timestamp("1970-01-01")) / pd.Timedelta(days=1)).to_numpy()
+    terms = {}
+    for k in range(1, harmonics + 1):
+        terms[f"sin_{k}"] = np.sin(2 * np.pi * k * days / period)
+        terms[f"cos_{k}"] = np.cos(2 * np.pi * k * days / period)
+    return pd.DataFrame(terms, index=index)
 
-    for feature in data.columns:
-        try:
-            # Map display name back to the original column name
-            original_name = inverse_rename_mapping.get(feature, feature)
-            stationary_series = make_stationary(data[feature])
 
-            # Train SARIMA model
-            model = sm.tsa.statespace.SARIMAX(stationary_series,
+# Function to fit SARIMA on one feature and forecast it
+def fit_sarima_feature(feature, series, p, d, q, P, D, Q, m, future_days, city_name=None, harmonics=0,
+                       resolution="D"):
+    """
+    Returns (forecast, summary, metrics); forecast and metrics are None if the fit failed.
+    With city_name the fit is stored and later days are filtered with its parameters instead of refitting.
+    harmonics > 0 switches to the fast seasonal mode: ARIMA(p, d, q) on the raw series with that many annual
+    Fourier harmonics as regressors (plus a constant when d = 0); P, D, Q and m are then ignored.
+    resolution "W" or "M" fits weekly/monthly aggregates (so m=52 or m=12 is the annual cycle) and spreads the
+    forecast back over days.
+    """
+    try:
+        # Map display name back to the original column name
+        original_name = inverse_rename_mapping.get(feature, feature)
+        fit_series, steps = series, future_days
+        if resolution != "D":
+            fit_series = aggregate_series(series, feature, resolution)
+            steps = forecast_periods(series, fit_series, resolution, future_days)
+
+        if harmonics:
+            model_series, seasonal_order, trend = fit_series, (0, 0, 0, 0), "c" if d == 0 else "n"
+            exog = fourier_terms(fit_series.index, harmonics)
+            if resolution == "D":
+                future_dates = pd.date_range(exog.index[-1] + pd.Timedelta(days=1), periods=steps)
+            else:
+                future_dates = future_period_starts(fit_series, resolution, steps)
+            future_exog = fourier_terms(future_dates, harmonics)
+        else:
+            model_series, seasonal_order, trend = make_stationary(fit_series), (P, D, Q, m), None
+            exog = future_exog = None
+
+        # Train SARIMA model
+        if city_name:
+            store_name = feature if resolution == "D" else f"{feature} ({RESOLUTIONS[resolution]})"
+            model_fit, fit_status = fitted_results(model_series, city_name, store_name, "sarima", (p, d, q),
+                                                   seasonal_order, exog, trend)
+        else:
+            model = sm.tsa.statespace.SARIMAX(model_series,
+                                              exog=exog,
                                               order=(p, d, q),
-                                              seasonal_order=(P, D, Q, m))
-            model_fit = model.fit(disp=False)
+                                              seasonal_order=seasonal_order,
+                                              trend=trend)
+            model_fit, fit_status = model.fit(disp=False), "fitted"
 
-            # Generate forecast
-            forecast = model_fit.forecast(steps=future_days)
+        # Generate forecast
+        forecast = model_fit.forecast(steps=steps, exog=future_exog)
+        if resolution != "D":
+            forecast = disaggregate_forecast(forecast, series, fit_series, feature, resolution, future_days)
 
-            # Calculate Errors for forecast
-            actual_values = data[feature][-future_days:]  # Actual values for the forecasted period
+        # Calculate Errors for forecast
+        actual_values = series[-future_days:]  # Actual values for the forecasted period
 
-            forecasts[feature] = forecast.rename("Forecast")  # Standardize column name
+        print(f"Actual Values Length: {len(actual_values)}")
+        print(f"Forecast Length: {len(forecast)}")
 
-            print(f"Actual Values Length: {len(actual_values)}")
-            print(f"Forecast Length: {len(forecast)}")
+        # Calculate error metrics if actual values exist
+        if feature == "Total Precipitation":
+            metrics = calculate_metrics_precipitation(actual_values, forecast)
+        else:
+            metrics = calculate_metrics(actual_values, forecast)
 
-            # Calculate error metrics if actual values exist
-            if feature == "Total Precipitation":
-                metrics = calculate_metrics_precipitation(actual_values, forecast)
-            else:
-                metrics = calculate_metrics(actual_values, forecast)
-
-            summaries.append({
-                "Feature": feature,
-                "AR Coefficient": model_fit.params.get("ar.L1", np.nan),
-                "MA Coefficient": model_fit.params.get("ma.L1", np.nan),
-                "Sigma2": model_fit.params.get("sigma2", np.nan),
-                "AIC": model_fit.aic,
-                "BIC": model_fit.bic,
-                "MSE": metrics["MSE"],
-                "MAE": metrics["MAE"],
-                "R²": metrics["R²"],
-                "MAPE (%)": metrics["MAPE"],
-                "SMAPE (%)": metrics["SMAPE"],
-                "Accuracy (%)": metrics["Accuracy"]
-            })
-
-            # Aggregate metrics across features
-            overall_metrics[feature] = {
-                "MSE": metrics["MSE"],
-                "MAE": metrics["MAE"],
-                "R²": metrics["R²"],
-                "MAPE": metrics["MAPE"],
-                "SMAPE": metrics["SMAPE"],
-                "Accuracy": metrics["Accuracy"]
-            }
-
-        except Exception as e:
-            forecasts[feature] = None
-            summaries.append({"Feature": feature, "Error": str(e)})
-    return forecasts, summaries, overall_metrics
+        summary = {
+            "Feature": feature,
+            "AR Coefficient": model_fit.params.get("ar.L1", np.nan),
+            "MA Coefficient": model_fit.params.get("ma.L1", np.nan),
+            "Sigma2": model_fit.params.get("sigma2", np.nan),
+            "AIC": model_fit.aic,
+            "BIC": model_fit.bic,
+            "MSE": metrics["MSE"],
+            "MAE": metrics["MAE"],
+            "R²": metrics["R²"],
+            "MAPE (%)": metrics["MAPE"],
+            "SMAPE (%)": metrics["SMAPE"],
+            "Accuracy (%)": metrics["Accuracy"],
+            "Fit": fit_status
+        }
+        return forecast.rename("Forecast"), summary, metrics  # Standardize column name
+
+    except Exception as e:
+        return None, {"Feature": feature, "Error": str(e)}, None
+
+
+# SARIMA Forecast Function (Handles Renamed Features)
+def sarima_forecast(data, p, d, q, P, D, Q, m, future_days, workers=None, orders=None, city_name=None,
+                    harmonics=0, resolution="D"):
+    """
+    Train SARIMA models and forecast future values.
+    Features are fitted in parallel on the shared process pool; workers=1 fits them one after another.
+    orders maps features to their own ((p, d, q), (P, D, Q, m)), e.g. from auto_orders.
+    city_name keeps the fitted parameters so new days only need a filter pass (see fitted_results).
+    harmonics > 0 models the yearly cycle with Fourier terms instead of a seasonal order (see fit_sarima_feature).
+    resolution "W"/"M" fits weekly/monthly aggregates, disaggregated to daily forecasts by climatology.
+    """
+    orders = orders or {}
+    tasks = []
+    for feature in data.columns:
+        order, seasonal_order = orders.get(feature, ((p, d, q), (P, D, Q, m)))
+        tasks.append((feature, data[feature], *order, *seasonal_order, future_days, city_name, harmonics,
+                      resolution))
+    results = run_fits(fit_sarima_feature, tasks, workers)
+    return merge_feature_results(list(data.columns), results)
+
+
+# Function to fit SARIMA for many cities at once, every city x feature fit sharing one pool
+def sarima_forecast_batch(city_data, p, d, q, P, D, Q, m, future_days, workers=None):
+    """city_data maps city names to feature DataFrames; returns {city: (forecasts, summaries, overall_metrics)}."""
+    tasks = [(city, feature) for city, data in city_data.items() for feature in data.columns]
+    results = run_fits(fit_sarima_feature, [(feature, city_data[city][feature], p, d, q, P, D, Q, m, future_days,
+                                             city) for city, feature in tasks], workers)
+    return {city: merge_feature_results(list(data.columns),
+                                        [result for (task_city, _), result in zip(tasks, results) if task_city == city])
+            for city, data in city_data.items()}
@@ -0,0 +1,122 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from Utils.constants import dataset_schema
+
+# Binary columnar format used for stored datasets; CSV is still read for older files
+DATASET_FORMAT = ".feather"
+DATASET_EXTENSIONS = (DATASET_FORMAT, ".csv")
+
+
+# Function to build the path of a city's dataset
+def dataset_path(city_name, till_date, folder="Datasets", extension=DATASET_FORMAT):
+    return os.path.join(folder, f"{city_name}_{till_date}{extension}")
+
+
+# Function to write a dataset to the columnar store
+def save_dataset(data, city_name, till_date, folder="Datasets", export_csv=False):
+    """
+    Write the dataset as an uncompressed Feather (Arrow IPC) file so it can be memory-mapped on load.
+    The file is written to a temporary path and then renamed, so readers never see a partial dataset.
+    Optionally export a CSV copy alongside it.
+    """
+    os.makedirs(folder, exist_ok=True)
+    file_path = dataset_path(city_name, till_date, folder)
+    temp_path = f"{file_path}.tmp"
+    table = pa.Table.from_pandas(apply_schema(data.reset_index(drop=True)), preserve_index=False)
+    feather.write_feather(table, temp_path, compression="uncompressed")
+    os.replace(temp_path, file_path)
+
+    if export_csv:
+        data.to_csv(dataset_path(city_name, till_date, folder, ".csv"), index=False)
+    return file_path
+
+
+# Function to cast the daily variables to their declared compact dtypes
+def apply_schema(data):
+    schema = {column: dtype for column, dtype in dataset_schema.items() if column in data.columns}
+    return data.astype(schema, copy=False)
+
+
+# Function to turn a date bound into a naive UTC datetime64 comparable with stored dates
+def _utc_datetime64(value, utc_offset=np.timedelta64(0, "s")):
+    """Dates without a timezone are calendar days of the dataset's location, utc_offset ahead of UTC."""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        return timestamp.to_datetime64() - utc_offset
+    return timestamp.tz_convert("UTC").tz_localize(None).to_datetime64()
+
+
+# Function to get the UTC offset of a dataset's location from its stored dates
+def _utc_offset(date):
+    """Stored dates are the location's midnights expressed in UTC, so their time of day gives the offset."""
+    date = np.datetime64(date, "s")
+    seconds = int((date - date.astype("datetime64[D]")) / np.timedelta64(1, "s"))
+    return np.timedelta64(-seconds if seconds <= 12 * 3600 else 24 * 3600 - seconds, "s")
+
+
+# Function to work out the [start, end) window of dates to load
+def _date_window(last_date, start_date=None, end_date=None, last_n_years=None):
+    """last_date is the latest stored date as a naive UTC datetime64."""
+    utc_offset = _utc_offset(last_date)
+    start = _utc_datetime64(start_date, utc_offset) if start_date is not None else None
+    # The end bound is exclusive so that the whole end_date day is included
+    end = _utc_datetime64(pd.Timestamp(end_date) + pd.Timedelta(days=1), utc_offset) if end_date is not None else None
+    if last_n_years:
+        years_start = (pd.Timestamp(last_date) - pd.DateOffset(years=int(last_n_years))).to_datetime64()
+        start = years_start if start is None else max(start, years_start)
+    return start, end
+
+
+# Function to load a dataset from the columnar store (or a legacy CSV)
+def load_dataset(file_path, start_date=None, end_date=None, last_n_years=None):
+    """
+    Load a dataset with a parsed "date" column and the dtypes of dataset_schema.
+    Feather files are memory-mapped, so no text parsing or date conversion from strings is needed.
+    - start_date / end_date (inclusive) or last_n_years restrict the rows that are loaded.
+    - For Feather files only the date column is scanned; the window is a zero-copy slice of the mapped table,
+      so rows outside it are never converted.
+    """
+    windowed = start_date is not None or end_date is not None or last_n_years
+    if file_path.endswith(DATASET_FORMAT):
+        table = feather.read_table(file_path, memory_map=True)
+        if windowed and table.num_rows:
+            dates = table.column("date").to_numpy()
+            start, end = _date_window(dates[-1], start_date, end_date, last_n_years)
+            if np.all(dates[1:] >= dates[:-1]):
+                first = 0 if start is None else np.searchsorted(dates, start, side="left")
+                last = len(dates) if end is None else np.searchsorted(dates, end, side="left")
+                table = table.slice(first, max(last - first, 0))
+            else:
+                mask = np.ones(len(dates), dtype=bool)
+                if start is not None:
+                    mask &= dates >= start
+                if end is not None:
+                    mask &= dates < end
+                table = table.filter(pa.array(mask))
+        return apply_schema(table.to_pandas(split_blocks=True))
+
+    data = pd.read_csv(file_path, parse_dates=["date"], dtype=dataset_schema)
+    if windowed and len(data):
+        dates = data["date"].dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+        start, end = _date_window(dates.max(), start_date, end_date, last_n_years)
+        mask = np.ones(len(dates), dtype=bool)
+        if start is not None:
+            mask &= dates >= start
+        if end is not None:
+            mask &= dates < end
+        data = data[mask].reset_index(drop=True)
+    return data
+
+
+# Function to list the stored dataset of every city in a folder
+def list_city_datasets(folder="Datasets"):
+    """Return {city: file name}, preferring the columnar file when a city also has a CSV."""
+    city_files = {}
+    for extension in reversed(DATASET_EXTENSIONS):
+        for f in sorted(os.listdir(folder)):
+            if f.endswith(extension):
+                city_files[f.split('_')[0]] = f
+    return city_files
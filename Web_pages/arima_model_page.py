@@ -7,6 +7,11 @@ from Utils.constants import rename_mapping
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from Utils.data_utils import clean_data
+from Utils.cache_utils import cached_result, cache_summary
+from Utils.storage_utils import list_city_datasets, load_dataset
+from Utils.order_search_utils import auto_orders
+from Utils.resample_utils import RESOLUTIONS
+from Utils.backtest_utils import backtest_forecasts
 
 
 # ARIMA Model Page
@@ -14,13 +19,14 @@ def arima_model_page():
     st.title("ARIMA Model")
 
     # Load dataset
-    city_files = [f for f in os.listdir("Datasets") if f.endswith(".csv")]
-    city_names = {f.split('_')[0]: f for f in city_files}
+    city_names = list_city_datasets("Datasets")
     selected_city = st.selectbox("Select a City", list(city_names.keys()))
+    history_years = st.number_input("Years of history to fit (0 = all)", min_value=0, value=0,
+                                    help="Fewer years load and fit faster; older rows are never read.")
 
     if selected_city:
         file_path = os.path.join("Datasets", city_names[selected_city])
-        data = pd.read_csv(file_path, parse_dates=["date"], index_col="date")
+        data = load_dataset(file_path, last_n_years=history_years or None).set_index("date")
 
         # Rename features for presentability
         data.rename(columns=rename_mapping, inplace=True)
@@ -34,6 +40,22 @@ def arima_model_page():
         with col3:
             q = st.number_input("ARIMA(q): Moving Average Order", min_value=0, value=1)
         future_days = st.slider("Select the number of future days to predict", 1, 30, 7)
+        resolution = st.selectbox("Fit resolution", list(RESOLUTIONS.keys()), format_func=RESOLUTIONS.get,
+                                  help="Weekly or monthly fits are much cheaper on long histories; forecasts "
+                                       "are spread back over days with each day's climatology.")
+        auto_order = st.checkbox("Auto-select orders per feature",
+                                 help="Pick d with the ADF test, then grid-search p and q for every feature by "
+                                      "AIC at the fit resolution; the choice is remembered until the data changes.")
+        backtest = st.checkbox("Rolling-origin backtest",
+                               help="Repeat this forecast from many past days (weeks or months at those fit "
+                                    "resolutions) with parameters estimated before them and score every horizon "
+                                    "day against what actually happened.")
+        if backtest:
+            col1, col2 = st.columns(2)
+            with col1:
+                n_origins = st.number_input("Backtest origins", min_value=10, max_value=2000, value=200)
+            with col2:
+                refit_every = st.number_input("Re-estimate every N origins (0 = once)", min_value=0, value=0)
 
         # Filter for specific features
         selected_features = list(rename_mapping.values())
@@ -44,15 +66,28 @@ def arima_model_page():
         st.write("## Stationarity Check")
         stationarity_results = []
         for column in filtered_data.columns:
-            result = check_stationarity(filtered_data[column])
+            result = cached_result("adf", check_stationarity, filtered_data[column])
             stationarity_results.append({"Feature": column, "ADF Statistic": result["ADF Statistic"],
                                          "p-value": result["p-value"]})
         stationarity_df = pd.DataFrame(stationarity_results)
         st.table(stationarity_df)
 
+        # Pick orders automatically
+        orders = None
+        if auto_order:
+            with st.spinner("Searching ARIMA orders..."):
+                chosen = auto_orders(filtered_data, selected_city, "arima", resolution=resolution)
+            orders = {feature: tuple(result["order"]) for feature, result in chosen.items()}
+            st.table(pd.DataFrame([{"Feature": feature, "Order (p, d, q)": str(orders[feature]),
+                                    "AIC": result["aic"], "Status": result["status"]}
+                                   for feature, result in chosen.items()]))
+
         # Train ARIMA
         st.write("## ARIMA Forecasts")
-        forecasts, summaries, overall_metrics = arima_forecast(filtered_data, int(p), int(d), int(q), future_days)
+        forecasts, summaries, overall_metrics = cached_result("arima", arima_forecast, filtered_data,
+                                                              int(p), int(d), int(q), future_days, None, orders,
+                                                              selected_city, resolution)
+        st.caption(cache_summary())
 
         # Prepare Metrics data for display in a table
         table_data = {
@@ -76,6 +111,21 @@ def arima_model_page():
         st.write("### Evaluation Metrics Summary")
         st.table(metrics_df)
 
+        # Honest accuracy: errors of forecasts made from past days, per horizon
+        if backtest:
+            st.write("### Rolling-Origin Backtest")
+            backtest_orders = {feature: (order, (0, 0, 0, 0)) for feature, order in (orders or {}).items()}
+            with st.spinner("Backtesting..."):
+                backtests = cached_result("backtest", backtest_forecasts, filtered_data, int(p), int(d), int(q),
+                                          0, 0, 0, 0, future_days, int(n_origins), int(refit_every), 0, None,
+                                          backtest_orders, "arima", resolution)
+            for feature, result in backtests.items():
+                st.write(f"#### {feature}")
+                if isinstance(result, str):
+                    st.error(f"Backtest failed: {result}")
+                else:
+                    st.table(result.round(3))
+
         # Overall Accuracy
         overall_accuracy = np.nanmean([
             metrics["Accuracy"] for feature, metrics in overall_metrics.items() if feature != "Total Precipitation"
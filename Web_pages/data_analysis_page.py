@@ -1,9 +1,12 @@
 import streamlit as st
 import os
-import pandas as pd
+import time
 from datetime import datetime, timedelta
-from Utils.data_utils import check_and_get_file, fetch_weather_data, get_lat_lon
+from Utils.async_ingest_utils import start_ingest_job
+from Utils.data_utils import cache_session, check_and_get_file
+from Utils.http_cache_utils import http_cache_summary
 from Utils.analysis_utils import analyze_data
+from Utils.storage_utils import load_dataset
 
 
 def data_analysis_page():
@@ -20,18 +23,22 @@ def data_analysis_page():
 
         if file_name:
             st.write(f"Data for {city_name} till {till_date} already exists. Loading from file...")
-            data = pd.read_csv(file_name, parse_dates=["date"])
+            data = load_dataset(file_name)
         else:
-            try:
-                latitude, longitude = get_lat_lon(city_name)
+            # Ingestion runs on a shared background event loop; this rerun only reports its progress
+            job = start_ingest_job(city_name, till_date, folder)
+            if not job["done"]:
                 st.write(f"Fetching data for {city_name}...")
-                data = fetch_weather_data(city_name, latitude, longitude)
-                file_name = os.path.join(folder, f"{city_name}_{till_date}.csv")
-                data.to_csv(file_name, index=False)
-                st.write(f"Data saved to {file_name}.")
-            except Exception as e:
-                st.error(f"Error: {e}")
+                st.progress(job["progress"], text=job["stage"])
+                time.sleep(0.5)
+                st.rerun()
+            if job["error"] is not None:
+                st.error(f"Error: {job['error']}")
                 return
+            file_name = job["file_path"]
+            st.write(f"Data saved to {file_name}.")
+            st.caption(http_cache_summary(cache_session))
+            data = load_dataset(file_name)
 
         # Perform analysis
         analyze_data(data, city_name)
@@ -1,11 +1,12 @@
 import streamlit as st
 import os
 import pandas as pd
-from Utils.lstm_utils import train_lstm_model
+from Utils.lstm_registry_utils import serve_lstm_forecast, delete_lstm_entry
 from Utils.constants import rename_mapping
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from Utils.data_utils import clean_data
+from Utils.storage_utils import list_city_datasets, load_dataset
 
 
 # LSTM Model Page
@@ -13,16 +14,18 @@ def lstm_model_page():
     st.title("LSTM Model")
     st.write("### Select a City for LSTM")
 
-    city_files = [f for f in os.listdir("Datasets") if f.endswith(".csv")]
-    city_names = {f.split('_')[0]: f for f in city_files}
+    city_names = list_city_datasets("Datasets")
     selected_city = st.selectbox("Select City", list(city_names.keys()))
+    history_years = st.number_input("Years of history to train on (0 = all)", min_value=0, value=0,
+                                    help="Fewer years load and train faster; older rows are never read.")
 
     future_days = st.slider("Select number of future days for prediction", 1, 30, 7)
+    retrain = st.button("Retrain from scratch", help="Discard the saved model for this city and train a new one.")
 
     if selected_city:
         # Load data
         file_path = os.path.join("Datasets", city_names[selected_city])
-        data = pd.read_csv(file_path, parse_dates=["date"])
+        data = load_dataset(file_path, last_n_years=history_years or None)
         data.set_index("date", inplace=True)
         features = list(rename_mapping.keys())
         data = data[features]
@@ -43,7 +46,12 @@ def lstm_model_page():
         # Train and Predict
         st.write("Training the LSTM model...")
         try:
-            train_loss, test_loss, forecast, r2 = train_lstm_model(data.values, future_days, n_steps=30)
+            if retrain:
+                delete_lstm_entry(selected_city)
+            train_loss, test_loss, forecast, r2, status = serve_lstm_forecast(data, selected_city, future_days, 30)
+            st.caption({"served": "Forecast from the saved model (data unchanged).",
+                        "fine-tuned": "Saved model fine-tuned on the new days.",
+                        "trained": "New model trained and saved."}[status])
 
             # Prepare forecast DataFrame
             last_date = pd.to_datetime(data.index[-1])
@@ -6,6 +6,11 @@ from Utils.constants import rename_mapping
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from Utils.data_utils import clean_data
+from Utils.cache_utils import cached_result, cache_summary
+from Utils.storage_utils import list_city_datasets, load_dataset
+from Utils.order_search_utils import auto_orders
+from Utils.resample_utils import RESOLUTIONS
+from Utils.backtest_utils import backtest_forecasts
 import numpy as np
 
 
@@ -15,13 +20,14 @@ def sarima_model_page():
     st.write("### Select a City for SARIMA")
 
     # File Selection
-    city_files = [f for f in os.listdir("Datasets") if f.endswith(".csv")]
-    city_names = {f.split('_')[0]: f for f in city_files}
+    city_names = list_city_datasets("Datasets")
     selected_city = st.selectbox("Select a City", list(city_names.keys()))
+    history_years = st.number_input("Years of history to fit (0 = all)", min_value=0, value=0,
+                                    help="Fewer years load and fit faster; older rows are never read.")
 
     if selected_city:
         file_path = os.path.join("Datasets", city_names[selected_city])
-        data = pd.read_csv(file_path, parse_dates=["date"], index_col="date")
+        data = load_dataset(file_path, last_n_years=history_years or None).set_index("date")
 
         # Rename features for better display
         data = data.rename(columns=rename_mapping)
@@ -39,7 +45,29 @@ def sarima_model_page():
             q = st.number_input("Non-Seasonal MA(q)", min_value=0, value=1)
             Q = st.number_input("Seasonal MA(Q)", min_value=0, value=1)
         m = st.number_input("Seasonal Period(m)", min_value=1, value=12)
+        fourier_mode = st.checkbox("Fast annual seasonality (Fourier terms)",
+                                   help="Model the yearly cycle with sine/cosine regressors on ARIMA(p, d, q) "
+                                        "instead of the seasonal order, which is too slow at m=365.")
+        harmonics = st.number_input("Fourier harmonics", min_value=1, max_value=10, value=3) if fourier_mode else 0
         future_days = st.slider("Future Days to Predict", 1, 30, 7)
+        resolution = st.selectbox("Fit resolution", list(RESOLUTIONS.keys()), format_func=RESOLUTIONS.get,
+                                  help="Weekly or monthly fits are much cheaper on long histories (use m=52 or "
+                                       "m=12 for the annual cycle); forecasts are spread back over days with each "
+                                       "day's climatology.")
+        auto_order = st.checkbox("Auto-select orders per feature",
+                                 help="Pick d with the ADF test, then grid-search p, q, P and Q (only p and q with "
+                                      "Fourier terms) for every feature by AIC at the fit resolution, keeping the "
+                                      "seasonal period m; the choice is remembered until the data changes.")
+        backtest = st.checkbox("Rolling-origin backtest",
+                               help="Repeat this forecast from many past days (weeks or months at those fit "
+                                    "resolutions) with parameters estimated before them and score every horizon "
+                                    "day against what actually happened.")
+        if backtest:
+            col1, col2 = st.columns(2)
+            with col1:
+                n_origins = st.number_input("Backtest origins", min_value=10, max_value=2000, value=200)
+            with col2:
+                refit_every = st.number_input("Re-estimate every N origins (0 = once)", min_value=0, value=0)
 
         # Filter relevant features
         selected_features = ["Mean Temperature", "Feels-Like Temperature",
@@ -47,10 +75,26 @@ def sarima_model_page():
         filtered_data = data[selected_features]
         filtered_data = clean_data(filtered_data)
 
+        # Pick orders automatically
+        orders = None
+        if auto_order:
+            with st.spinner("Searching SARIMA orders..."):
+                chosen = auto_orders(filtered_data, selected_city, "sarima", m=int(m), resolution=resolution,
+                                     harmonics=int(harmonics))
+            orders = {feature: (tuple(result["order"]), tuple(result["seasonal_order"]))
+                      for feature, result in chosen.items()}
+            st.table(pd.DataFrame([{"Feature": feature, "Order (p, d, q)": str(orders[feature][0]),
+                                    "Seasonal (P, D, Q, m)": str(orders[feature][1]), "AIC": result["aic"],
+                                    "Status": result["status"]} for feature, result in chosen.items()]))
+
         # Forecast using SARIMA
         st.write("## SARIMA Forecasts")
-        forecasts, summaries, overall_metrics = sarima_forecast(filtered_data, int(p), int(d), int(q),
-                                               int(P), int(D), int(Q), int(m), future_days)
+        forecasts, summaries, overall_metrics = cached_result("sarima", sarima_forecast, filtered_data,
+                                                              int(p), int(d), int(q),
+                                                              int(P), int(D), int(Q), int(m), future_days,
+                                                              None, orders, selected_city, int(harmonics),
+                                                              resolution)
+        st.caption(cache_summary())
 
         # Prepare Metrics data for display in a table
         table_data = {
@@ -85,6 +129,20 @@ def sarima_model_page():
         st.write("### Evaluation Metrics Summary")
         st.table(metrics_df)
 
+        # Honest accuracy: errors of forecasts made from past days, per horizon
+        if backtest:
+            st.write("### Rolling-Origin Backtest")
+            with st.spinner("Backtesting..."):
+                backtests = cached_result("backtest", backtest_forecasts, filtered_data, int(p), int(d), int(q),
+                                          int(P), int(D), int(Q), int(m), future_days, int(n_origins),
+                                          int(refit_every), int(harmonics), None, orders, "sarima", resolution)
+            for feature, result in backtests.items():
+                st.write(f"#### {feature}")
+                if isinstance(result, str):
+                    st.error(f"Backtest failed: {result}")
+                else:
+                    st.table(result.round(3))
+
         # Save summaries to CSV
         os.makedirs("Assets/SARIMA/Summaries", exist_ok=True)
         summary_df = pd.DataFrame(summaries)
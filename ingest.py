@@ -0,0 +1,46 @@
+import argparse
+import time
+from Utils.data_utils import cache_session
+from Utils.geocode_utils import load_gazetteer
+from Utils.http_cache_utils import http_cache_summary
+from Utils.ingest_utils import ingest_cities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch or refresh weather datasets for many cities.")
+    parser.add_argument("cities", nargs="*", help='City names, or "Name:latitude,longitude"')
+    parser.add_argument("--file", help="Text file with one city per line")
+    parser.add_argument("--folder", default="Datasets", help="Folder the datasets are written to")
+    parser.add_argument("--till-date", help="Last day to fetch (YYYY-MM-DD), defaults to yesterday")
+    parser.add_argument("--batch-size", type=int, default=10, help="Locations per archive request")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent geocoding/download workers")
+    parser.add_argument("--gazetteer", help="CSV with city,latitude,longitude columns to preload the geocode store")
+    parser.add_argument("--csv", action="store_true", help="Also export each dataset as CSV")
+    args = parser.parse_args()
+
+    cities = list(args.cities)
+    if args.file:
+        with open(args.file) as f:
+            cities += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not cities:
+        parser.error("No cities given.")
+
+    if args.gazetteer:
+        print(f"Preloaded {load_gazetteer(args.gazetteer)} cities from {args.gazetteer}")
+
+    def on_result(city_name, outcome):
+        if isinstance(outcome, Exception):
+            print(f"[FAILED] {city_name}: {outcome}")
+        else:
+            print(f"[OK] {city_name} -> {outcome}")
+
+    start = time.perf_counter()
+    results = ingest_cities(cities, args.folder, args.till_date, args.batch_size, args.workers, args.csv, on_result)
+    failed = sum(isinstance(outcome, Exception) for outcome in results.values())
+    print(f"Ingested {len(results) - failed}/{len(results)} cities in {time.perf_counter() - start:.1f}s")
+    print(http_cache_summary(cache_session))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
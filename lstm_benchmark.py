@@ -0,0 +1,35 @@
+import argparse
+import os
+from Utils.lstm_benchmark_utils import benchmark_lstm_training, config_grid
+from Utils.lstm_utils import LSTMTrainingConfig
+
+
+def _jit(value):
+    return {"true": True, "false": False}.get(value.lower(), value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LSTM training settings on a bundled dataset.")
+    parser.add_argument("--city", default="Bangalore")
+    parser.add_argument("--folder", default="Datasets")
+    parser.add_argument("--epochs", type=int, default=3, help="Epochs per configuration")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[32, 128])
+    parser.add_argument("--threads", type=int, nargs="+", default=[0], help="Intra-op threads (0 = all cores)")
+    parser.add_argument("--jit", type=_jit, nargs="+", default=["auto"], help="auto, true or false")
+    parser.add_argument("--activations", nargs="+", default=["relu", "tanh"])
+    parser.add_argument("--output", default=os.path.join("Assets", "LSTM", "benchmark.csv"))
+    args = parser.parse_args()
+
+    configs = config_grid(LSTMTrainingConfig(epochs=args.epochs), batch_size=args.batch_sizes,
+                          intra_op_threads=args.threads, jit_compile=args.jit, activation=args.activations)
+    results = benchmark_lstm_training(configs, args.city, args.folder)
+    columns = ["batch_size", "intra_op_threads", "jit_compile", "activation", "samples_per_sec", "step_ms",
+               "first_epoch_seconds", "peak_memory_mb", "test_loss"]
+    print(results[columns].to_string(index=False))
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    results.to_csv(args.output, index=False)
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
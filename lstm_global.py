@@ -0,0 +1,35 @@
+import argparse
+import os
+import time
+from Utils.lstm_utils import train_global_lstm_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train one LSTM on many stored cities and forecast them all.")
+    parser.add_argument("cities", nargs="*", help="Cities with a dataset in --folder (default: all)")
+    parser.add_argument("--folder", default="Datasets", help="Folder with the datasets")
+    parser.add_argument("--future-days", type=int, default=7)
+    parser.add_argument("--n-steps", type=int, default=30)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--city-embedding", action="store_true", help="Give the model a learned per-city input")
+    parser.add_argument("--output", default=os.path.join("Assets", "LSTM", "Global"),
+                        help="Folder the per-city forecasts are written to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    _, train_loss, test_loss, r2_scores, forecasts = train_global_lstm_model(
+        args.folder, args.cities or None, args.future_days, args.n_steps, args.city_embedding, args.epochs,
+        args.batch_size)
+    print(f"Trained on {len(forecasts)} cities in {time.perf_counter() - start:.1f}s "
+          f"(train loss {train_loss:.5f}, test loss {test_loss:.5f})")
+
+    os.makedirs(args.output, exist_ok=True)
+    for city, forecast in forecasts.items():
+        save_path = os.path.join(args.output, f"{city}_LSTM_Predictions.csv")
+        forecast.round(2).to_csv(save_path, index_label="date")
+        print(f"{city}: test R^2 {r2_scores[city] * 100:.0f}%, forecast saved to {save_path}")
+
+
+if __name__ == "__main__":
+    main()
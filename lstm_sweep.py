@@ -0,0 +1,42 @@
+import argparse
+import os
+import time
+from Utils.lstm_sweep_utils import SWEEP_GRID, run_lstm_sweep
+from Utils.storage_utils import list_city_datasets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search LSTM hyperparameters for a city on a process pool.")
+    parser.add_argument("city", help="City with a dataset in --folder")
+    parser.add_argument("--folder", default="Datasets", help="Folder with the datasets")
+    parser.add_argument("--years", type=int, default=0, help="Years of history to use (0 = all)")
+    parser.add_argument("--n-steps", type=int, nargs="+", default=SWEEP_GRID["n_steps"])
+    parser.add_argument("--units", type=int, nargs="+", default=SWEEP_GRID["units"])
+    parser.add_argument("--dropout", type=float, nargs="+", default=SWEEP_GRID["dropout"])
+    parser.add_argument("--min-epochs", type=int, default=2, help="Epochs every trial gets in the first rung")
+    parser.add_argument("--max-epochs", type=int, default=20, help="Epochs the surviving trials reach")
+    parser.add_argument("--eta", type=int, default=3, help="Keep the best 1/eta of the trials after each rung")
+    parser.add_argument("--patience", type=int, default=3, help="Early stopping patience in epochs")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: up to 4)")
+    parser.add_argument("--threads", type=int, help="TensorFlow threads per worker (default: cores / workers)")
+    args = parser.parse_args()
+
+    city_files = list_city_datasets(args.folder)
+    if args.city not in city_files:
+        parser.error(f"No dataset for {args.city} in {args.folder}.")
+
+    def on_rung(rung, budget, results):
+        best = min(result["val_loss"] for result in results)
+        print(f"Rung {rung}: {len(results)} trials trained to {budget} epochs, best val loss {best:.5f}")
+
+    start = time.perf_counter()
+    grid = {"n_steps": args.n_steps, "units": args.units, "dropout": args.dropout}
+    leaderboard = run_lstm_sweep(os.path.join(args.folder, city_files[args.city]), grid, args.years or None,
+                                 args.min_epochs, args.max_epochs, args.eta, args.patience, workers=args.workers,
+                                 threads_per_worker=args.threads, on_rung=on_rung)
+    print(leaderboard.head(10).to_string(index=False))
+    print(f"Swept {len(leaderboard)} configurations in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 import streamlit as st
-from Web_pages.about_page import about_page
-from Web_pages.data_analysis_page import data_analysis_page
-from Web_pages.lstm_model_page import lstm_model_page
-from Web_pages.arima_model_page import arima_model_page
-from Web_pages.sarima_model_page import sarima_model_page
-from Web_pages.model_comparision_page import model_comparison_page
+from Utils.page_utils import load_page, page_import_summary
+
+# Pages in sidebar order: title -> (module, page function). A page's module, and the libraries it needs, are
+# only imported the first time the page is opened.
+PAGES = {
+    "About": ("Web_pages.about_page", "about_page"),
+    "Data Analysis": ("Web_pages.data_analysis_page", "data_analysis_page"),
+    "LSTM Model": ("Web_pages.lstm_model_page", "lstm_model_page"),
+    "ARIMA Model": ("Web_pages.arima_model_page", "arima_model_page"),
+    "SARIMA Model": ("Web_pages.sarima_model_page", "sarima_model_page"),
+    "Model Comparison": ("Web_pages.model_comparision_page", "model_comparison_page"),
+}
 
 
 def main():
@@ -41,20 +47,13 @@ def main():
     # )
 
     st.sidebar.title("Weather Analysis and Prediction")
-    page = st.sidebar.radio("Try it out!", ["About", "Data Analysis", "LSTM Model", "ARIMA Model",
-                                                "SARIMA Model", "Model Comparison"])
-    if page == "About":
-        about_page()
-    elif page == "Data Analysis":
-        data_analysis_page()
-    elif page == "LSTM Model":
-        lstm_model_page()
-    elif page == "ARIMA Model":
-        arima_model_page()
-    elif page == "SARIMA Model":
-        sarima_model_page()
-    elif page == "Model Comparison":
-        model_comparison_page()
+    page = st.sidebar.radio("Try it out!", list(PAGES.keys()))
+    module_name, function_name = PAGES[page]
+    page_function = load_page(module_name, function_name)
+    summary = page_import_summary(module_name)
+    if summary:
+        st.sidebar.caption(summary)
+    page_function()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+import argparse
+import time
+from Utils.replay_utils import start_replay_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Open-Meteo archive and Nominatim APIs.")
+    parser.add_argument("--recordings", default="Recordings", help="Folder with recorded responses")
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay",
+                        help="record proxies to the real services and saves their answers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status used for injected errors")
+    parser.add_argument("--any-location", action="store_true",
+                        help="Serve recordings for unrecorded locations so load tests can use many cities")
+    args = parser.parse_args()
+
+    server, base_url = start_replay_server(args.recordings, args.host, args.port, args.mode, args.latency,
+                                           args.jitter, args.error_rate, args.error_status, args.any_location)
+    print(f"Serving {args.mode} on {base_url}. Point the app at it with:")
+    print(f"  OPENMETEO_ARCHIVE_URL={base_url}/v1/archive NOMINATIM_DOMAIN={args.host}:{server.server_port} "
+          f"NOMINATIM_SCHEME=http")
+    print(f"Request statistics: {base_url}/__stats")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()